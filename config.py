@@ -81,10 +81,35 @@ DOMAIN_CONFIGS = {
 BATCH_CONFIG = {
     "batch_size": 10,  
     "max_retries": 2,
+    "retry_backoff": 0.5,  # Giây chờ lần đầu khi bị rate limit (429/503), nhân đôi mỗi lần
+    "retry_backoff_max": 4,  # Thời gian chờ tối đa giữa 2 lần thử
     "fallback_to_individual": True,
     "use_json_format": True,  
 }
 
+# ============================================================================
+# PARALLELISM
+# ============================================================================
+
+PARALLEL_CONFIG = {
+    "max_workers": 8,  # Số request LLM chạy song song (giới hạn bởi quota API)
+}
+
+# ============================================================================
+# CACHING
+# ============================================================================
+
+CACHE_CONFIG = {
+    "use_answer_cache": True,  # Cache đáp án theo (câu hỏi, lựa chọn); env ANSWER_CACHE=0 để tắt
+    "answer_cache_dir": "./.answer_cache",
+    "answer_cache_version": 1,  # Tăng khi sửa prompt viết trực tiếp trong main.py/predict.py
+    "use_semantic_cache": True,  # Câu hỏi gần giống nhau (cosine >= threshold) dùng lại kết quả RAG
+    "semantic_threshold": 0.95,
+    "semantic_nbits": 8,  # Số bit LSH mỗi bảng
+    "semantic_tables": 4,  # Số bảng LSH (nhiều bảng = recall cao hơn)
+    "semantic_max_entries": 4096,  # Giới hạn số câu lưu, xóa câu cũ nhất khi đầy
+}
+
 # ============================================================================
 # OUTPUT
 # ============================================================================
@@ -3,7 +3,7 @@ import json
 
 def get_embedding(text):
     # Load API keys from api-keys.json
-    with open('api-keys.json', 'r') as f:
+    with open('api-keys.json', 'r', encoding='utf-8') as f:
         api_keys = json.load(f)
 
     # Find the embedding API key
@@ -5,11 +5,20 @@ class ContentPolicyError(Exception):
     """Raised when API rejects content due to safety policy"""
     pass
 
+class RateLimitError(Exception):
+    """Raised when API is throttling (HTTP 429 / 503) - retry after a backoff"""
+    pass
+
+RATE_LIMIT_STATUS_CODES = (429, 503)
+
 def get_response(messages, model="small", temperature=1.0, max_tokens=1000, 
                  n=1, logprobs=None, top_logprobs=None, response_format=None, **kwargs):
     """
     Get response from VNPT AI API
     
+    The endpoint is stateless and has no cached-content / prompt-caching API,
+    so the full messages list (system prompt included) is sent on every call.
+    
     Args:
         messages: List of message dicts with 'role' and 'content'
         model: "small" or "large" (default: "small")
@@ -25,7 +34,7 @@ def get_response(messages, model="small", temperature=1.0, max_tokens=1000,
         str or dict: Response content from the model (or full response if n > 1)
     """
     # Load API keys from api-keys.json
-    with open('api-keys.json', 'r') as f:
+    with open('api-keys.json', 'r', encoding='utf-8') as f:
         api_keys = json.load(f)
 
     # Select API key based on model
@@ -73,6 +82,9 @@ def get_response(messages, model="small", temperature=1.0, max_tokens=1000,
 
     response = requests.post(api_endpoint, headers=headers, json=json_data)
 
+    if response.status_code in RATE_LIMIT_STATUS_CODES:
+        raise RateLimitError(f"API throttled with status {response.status_code}: {response.text}")
+
     if response.status_code != 200:
         raise Exception(f"API request failed with status {response.status_code}: {response.text}")
 
@@ -87,6 +99,10 @@ def get_response(messages, model="small", temperature=1.0, max_tokens=1000,
         if error_code == 400 and 'không thể trả lời' in error_msg.lower():
             raise ContentPolicyError(f"API rejected content: {error_msg}")
         
+        # Throttling reported in the response body
+        if error_code in RATE_LIMIT_STATUS_CODES:
+            raise RateLimitError(f"API error {error_code}: {error_msg}")
+        
         # Other errors
         raise Exception(f"API error {error_code}: {error_msg}")
     
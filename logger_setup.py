@@ -0,0 +1,41 @@
+"""
+logger_setup.py - Shared 'vnpt' logger for the pipeline
+
+Worker threads only enqueue records (QueueHandler); a single QueueListener
+thread formats and writes them to stdout, so logging never blocks a worker
+on terminal I/O. Level follows OUTPUT_CONFIG['verbose']: INFO when verbose,
+WARNING otherwise (per-question details are logged at INFO).
+"""
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from config import OUTPUT_CONFIG
+
+LOGGER_NAME = "vnpt"
+
+_listener = None
+
+
+def get_logger():
+    """Return the 'vnpt' logger, configuring the queue handler on first call"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush queued records on exit
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO if OUTPUT_CONFIG.get("verbose", True) else logging.WARNING)
+    logger.propagate = False
+    return logger
@@ -2,23 +2,36 @@ import json
 import csv
 import re
 import os
-from rag_langchain import LangChainRAG
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from prompt_templates import (
-    construct_prompt, construct_batch_prompt,
+    construct_prompt, construct_batch_prompt, format_choices,
     SYSTEM_PROMPTS, BATCH_SYSTEM_PROMPT,
     CLASSIFICATION_SYSTEM_PROMPT, CLASSIFICATION_USER_TEMPLATE
 )
-from get_response import get_response
+from get_response import get_response, RateLimitError
 from get_embedding import get_embedding
-from router_logic import QuestionRouter
+from pipeline_utils import (
+    get_rag, get_router, retrieve_docs, retrieve_docs_batch,
+    answer_cache_key, lookup_answer, remember_answer,
+    classify_item, classify_items, split_context,
+    FINAL_ANSWER_RE, VOTING_ANSWER_RE, STANDALONE_LETTER_RE, VERIFIED_RE,
+    BATCH_ANSWER_LIST_RE, BATCH_ITEM_ANSWER_RE, VALID_LETTERS,
+    parse_json_response, index_batch_answers, extract_answer_letter,
+    reorder_csv_by_input
+)
 from config import DOMAIN_CONFIGS
+from logger_setup import get_logger
 
-# Initialize RAG Pipeline and Router
-rag = LangChainRAG()
-router = QuestionRouter()
+logger = get_logger()
 
-# Ensure retriever is ready (loads BM25 + Vector)
-rag.setup_retriever()
+# Initialize RAG Pipeline and Router (loads BM25 + Vector)
+rag = get_rag()
+router = get_router()
+
+_ENTRY_POINT = os.path.basename(__file__)  # Keeps answer-cache keys apart from predict.py
 
 
 def is_rag_question(question_text):
@@ -97,8 +110,7 @@ def classify_questions_with_llm(questions_batch):
         )
         
         # Parse JSON response
-        response = response.replace("```json", "").replace("```", "").strip()
-        classifications = json.loads(response)
+        classifications = parse_json_response(response)
         
         # Map back to qids
         results = {}
@@ -113,55 +125,77 @@ def classify_questions_with_llm(questions_batch):
         return results
         
     except Exception as e:
-        print(f"  ⚠ LLM classification failed: {e}, falling back to rule-based")
+        logger.warning("  ⚠ LLM classification failed: %s, falling back to rule-based", e)
         # Fallback to rule-based router
-        results = {}
-        for item in questions_batch:
-            domain, _ = router.classify_question(item['question'], item.get('choices', []))
-            results[item['qid']] = domain
-        return results
+        return {
+            item['qid']: domain
+            for item, (domain, _) in zip(questions_batch, classify_items(questions_batch))
+        }
+
+
+# ============================================================================
+# ANSWER EXTRACTION PATTERNS (compiled once; shared ones live in pipeline_utils)
+# ============================================================================
 
+_SHORT_ANSWER_MARKER_RE = re.compile(r'(?:^|\s|[Đđ]áp án)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)', re.IGNORECASE)
+_CONTENT_ANSWER_PATTERNS = [
+    re.compile(r'(?:Đáp án|Answer|Trả lời)(?:\s*là)?(?:\s*:)?\s*([A-Z])', re.IGNORECASE | re.MULTILINE),
+    re.compile(r'^\s*([A-Z])\s*$', re.IGNORECASE | re.MULTILINE),
+    re.compile(r'\b([A-Z])\b', re.IGNORECASE | re.MULTILINE),
+]
 
-def solve_question(item):
+
+def solve_question(item, pre_classified_domain=None, confidence=None):
     """
     Solve a single question with domain-aware routing
+    
+    Args:
+        item: Question item dict
+        pre_classified_domain: Domain already classified upstream (skip re-classification)
+        confidence: Confidence of the upstream classification (default 1.0)
     """
     question_text = item['question']
     choices = item['choices']
     
-    # 1. Classify question into domain
-    domain, confidence = router.classify_question(question_text, choices)
+    # 1. Use pre-classified domain or classify with router
+    if pre_classified_domain:
+        domain = pre_classified_domain
+        confidence = 1.0 if confidence is None else confidence
+    else:
+        domain, confidence = classify_item(item)
+    
+    # Exact-duplicate question (same domain and setup): reuse the stored answer
+    cache_key = answer_cache_key(item, domain, _ENTRY_POINT)
+    cached_answer = lookup_answer(cache_key)
+    if cached_answer is not None:
+        logger.info("  Cache hit: %s -> %s", item.get('qid'), cached_answer)
+        return cached_answer
+    
     strategy = router.get_strategy_config(domain)
     
     # Debug: print STEM strategy
     if domain == "STEM":
-        print(f"  [DEBUG] STEM config: voting={strategy.get('use_majority_voting')}, verification={strategy.get('use_self_verification')}")
+        logger.debug("  [DEBUG] STEM config: voting=%s, verification=%s", strategy.get('use_majority_voting'), strategy.get('use_self_verification'))
     
     # STEM with self-verification (if enabled)
     if domain == "STEM" and strategy.get('use_self_verification', False):
-        return solve_stem_with_self_verification(item, strategy, domain, confidence)
+        return remember_answer(cache_key, solve_stem_with_self_verification(item, strategy, domain, confidence))
     
     # STEM with majority voting (default)
     if domain == "STEM" and strategy.get('use_majority_voting', False):
-        return solve_stem_with_voting(item, strategy, domain, confidence)
+        return remember_answer(cache_key, solve_stem_with_voting(item, strategy, domain, confidence))
     
     # 2. Get context based on domain strategy
-    context = ""
-    if "Đoạn thông tin" in question_text:
-        # Extract context from question (RAG domain)
-        parts = question_text.split("Câu hỏi:")
-        if len(parts) > 1:
-            context = parts[0].strip()
-            question_text = parts[-1].strip()
-    elif strategy['use_rag'] and strategy['top_k_docs'] > 0:
+    # Extract context embedded in the question (RAG domain)
+    context, question_text = split_context(question_text)
+    if not context and strategy['use_rag'] and strategy['top_k_docs'] > 0:
         # Use RAG retrieval for other domains if configured
-        retrieved_docs = rag.query(question_text)
-        # Limit to top_k_docs if needed
-        retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+        context = "\n\n".join(doc.page_content for doc in retrieved_docs)
     
     # 3. Construct domain-specific prompt
-    prompt = construct_prompt(question_text, choices, context, domain.lower())
+    prompt = construct_prompt(question_text, choices, context, domain.lower(),
+                              choices_str=item.get('_choices_str'))
     
     # 4. Call LLM with domain-specific system prompt
     system_prompt = SYSTEM_PROMPTS.get(
@@ -180,7 +214,7 @@ def solve_question(item):
             temperature=strategy.get('temperature', 0.3)
         )
     except Exception as e:
-        print(f"Error calling LLM for {domain}: {e}")
+        logger.warning("Error calling LLM for %s: %s", domain, e)
         raw_answer = ""
     
     # 5. Post-process answer (Extract A, B, C, D...)
@@ -188,39 +222,28 @@ def solve_question(item):
     num_choices = len(choices)
     max_valid_letter = chr(ord('A') + num_choices - 1)  # A + 0 = A, A + 5 = F, etc.
     
-    # Try to find answer after === marker first (new format)
-    match = re.search(r'===ĐÁP ÁN CUỐI CÙNG===\s*([A-Z])', raw_answer, re.IGNORECASE)
-    
-    if match:
-        answer = match.group(1).upper()
-    else:
-        # Fallback 1: find answer markers with dots or colons
-        answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời|[Kk]ết quả)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-        match = re.search(answer_pattern, raw_answer, re.IGNORECASE)
-        
-        if match:
-            answer = match.group(1).upper()
-        else:
-            # Fallback 2: find last standalone letter (not first!)
-            matches = re.findall(r'\b([A-Z])\b', raw_answer)
-            answer = matches[-1].upper() if matches else "A"
+    # Single scan: === marker first (new format), then answer markers,
+    # then last standalone letter (not first!)
+    answer = extract_answer_letter(raw_answer)
     
     # Validate: answer must be within valid range for this question
     if answer not in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
-        print(f"  Warning: Invalid answer '{answer}' (not a letter), defaulting to A")
+        logger.warning("  Warning: Invalid answer '%s' (not a letter), defaulting to A", answer)
         answer = "A"
     elif ord(answer) > ord(max_valid_letter):
-        print(f"  Warning: Answer '{answer}' exceeds choices (max={max_valid_letter}), defaulting to A")
+        logger.warning("  Warning: Answer '%s' exceeds choices (max=%s), defaulting to A", answer, max_valid_letter)
         answer = "A"
     
     # Debug info
-    print(f"  Domain: {domain} (conf: {confidence:.2f}) | Choices: {num_choices} (A-{max_valid_letter}) | Raw: '{raw_answer[:30]}...' -> {answer}")
+    logger.info("  Domain: %s (conf: %.2f) | Choices: %s (A-%s) | Raw: '%s...' -> %s", domain, confidence, num_choices, max_valid_letter, raw_answer[:30], answer)
     
-    return answer
+    # Only cache real LLM answers (an empty response or API error gives the uncached default "A")
+    return remember_answer(cache_key, answer if raw_answer else None)
 
 def solve_stem_with_voting(item, strategy, domain, confidence):
     """
     Solve STEM question with majority voting (n=5 completions)
+    Returns None when no usable answer came back (the answer cache skips it)
     """
     from collections import Counter
     from prompt_templates import SYSTEM_PROMPTS
@@ -231,12 +254,12 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
     # Get context
     context = ""
     if strategy['use_rag'] and strategy['top_k_docs'] > 0:
-        retrieved_docs = rag.query(question_text)
-        retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+        context = "\n\n".join(doc.page_content for doc in retrieved_docs)
     
     # Construct prompt
-    prompt = construct_prompt(question_text, choices, context, "stem")
+    prompt = construct_prompt(question_text, choices, context, "stem",
+                              choices_str=item.get('_choices_str'))
     system_prompt = SYSTEM_PROMPTS.get("stem", SYSTEM_PROMPTS["multidomain"])
     
     messages = [
@@ -261,12 +284,11 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
         for choice_item in response['choices']:
             content = choice_item['message']['content']
             # Extract answer
-            answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-            match = re.search(answer_pattern, content, re.IGNORECASE)
+            match = VOTING_ANSWER_RE.search(content)
             if match:
                 answer = match.group(1).upper()
             else:
-                match = re.search(r'\b([A-Z])\b', content)
+                match = STANDALONE_LETTER_RE.search(content)
                 answer = match.group(1).upper() if match else "A"
             
             # Validate
@@ -280,22 +302,22 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
         final_answer = vote_counts.most_common(1)[0][0]
         votes = vote_counts[final_answer]
         
-        print(f"  STEM Voting: {answers} → {final_answer} ({votes}/5 votes) | Domain: {domain} (conf: {confidence:.2f})")
+        logger.info("  STEM Voting: %s → %s (%s/5 votes) | Domain: %s (conf: %.2f)", answers, final_answer, votes, domain, confidence)
         return final_answer
         
     except Exception as e:
-        print(f"  STEM voting failed: {e}, falling back to single call")
+        logger.warning("  STEM voting failed: %s, falling back to single call", e)
         # Fallback
         raw_answer = get_response(messages, model=strategy.get('model', 'small'), temperature=0.3)
-        answer_pattern = r'(?:^|\s|[Đđ]áp án)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-        match = re.search(answer_pattern, raw_answer, re.IGNORECASE)
+        match = _SHORT_ANSWER_MARKER_RE.search(raw_answer)
         if match and 'A' <= match.group(1).upper() <= max_valid_letter:
             return match.group(1).upper()
-        return "A"
+        return None  # No usable answer: caller defaults to "A" (not cached)
 
 def solve_stem_with_self_verification(item, strategy, domain, confidence):
     """
     Solve STEM question with self-verification: generate answer then review full reasoning
+    Returns None when every attempt failed (the answer cache skips it)
     """
     from prompt_templates import SYSTEM_PROMPTS
     
@@ -308,19 +330,20 @@ def solve_stem_with_self_verification(item, strategy, domain, confidence):
     context = ""
     if strategy.get('use_rag', True) and strategy.get('top_k_docs', 1) > 0:
         try:
-            retrieved_docs = rag.query(question_text)
-            retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+            retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+            context = "\n\n".join(doc.page_content for doc in retrieved_docs)
         except Exception as e:
-            print(f"  RAG failed: {e}, continuing without context")
+            logger.warning("  RAG failed: %s, continuing without context", e)
             context = ""
     
     # System prompt with 4-step CoT
     system_prompt = SYSTEM_PROMPTS.get("stem", SYSTEM_PROMPTS["multidomain"])
-    user_prompt = construct_prompt(question_text, choices, context, "stem")
+    user_prompt = construct_prompt(question_text, choices, context, "stem",
+                                   choices_str=item.get('_choices_str'))
     
     max_attempts = strategy.get('verification_attempts', 2)
     
+    answer = None  # Stays None when every attempt fails (API errors)
     for attempt in range(max_attempts + 1):
         try:
             # Step 1: Generate answer with reasoning
@@ -343,10 +366,10 @@ def solve_stem_with_self_verification(item, strategy, domain, confidence):
             )
             
             # Extract answer with new format
-            answer_match = re.search(r'===ĐÁP ÁN CUỐI CÙNG===\s*([A-Z])', response, re.IGNORECASE)
+            answer_match = FINAL_ANSWER_RE.search(response)
             if not answer_match:
                 # Fallback: last letter
-                matches = re.findall(r'\b([A-Z])\b', response)
+                matches = STANDALONE_LETTER_RE.findall(response)
                 answer = matches[-1].upper() if matches else "A"
             else:
                 answer = answer_match.group(1).upper()
@@ -395,41 +418,33 @@ LÝ DO: [ngắn gọn]"""
                 )
                 
                 # Check verification
-                if re.search(r'\bĐÚNG\b', verify_response, re.IGNORECASE):
-                    print(f"  STEM Self-Verify: {answer} VERIFIED ✓ (attempt {attempt+1}) | Domain: {domain} (conf: {confidence:.2f})")
+                if VERIFIED_RE.search(verify_response):
+                    logger.info("  STEM Self-Verify: %s VERIFIED ✓ (attempt %s) | Domain: %s (conf: %.2f)", answer, attempt + 1, domain, confidence)
                     return answer
                 else:
-                    print(f"  STEM Self-Verify: {answer} REJECTED ✗ (retrying...)")
+                    logger.info("  STEM Self-Verify: %s REJECTED ✗ (retrying...)", answer)
                     continue
             else:
                 # Last attempt, no verification
-                print(f"  STEM Self-Verify: {answer} (final attempt) | Domain: {domain} (conf: {confidence:.2f})")
+                logger.info("  STEM Self-Verify: %s (final attempt) | Domain: %s (conf: %.2f)", answer, domain, confidence)
                 return answer
                 
         except Exception as e:
-            print(f"  Verification attempt {attempt+1} failed: {e}")
+            logger.warning("  Verification attempt %s failed: %s", attempt + 1, e)
             continue
     
-    # All attempts failed, return last answer
-    return answer if 'answer' in locals() else "A"
+    # All attempts failed, return last answer (None if no attempt produced one)
+    return answer
 
 def extract_answer_from_content(content, num_choices):
     """
     Extract answer letter from content with validation
     """
-    import re
-    
     max_valid_letter = chr(ord('A') + num_choices - 1)
     
     # Try patterns
-    patterns = [
-        r'(?:Đáp án|Answer|Trả lời)(?:\s*là)?(?:\s*:)?\s*([A-Z])',
-        r'^\s*([A-Z])\s*$',
-        r'\b([A-Z])\b'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE)
+    for pattern in _CONTENT_ANSWER_PATTERNS:
+        match = pattern.search(content)
         if match:
             answer = match.group(1).upper()
             if 'A' <= answer <= max_valid_letter:
@@ -444,27 +459,34 @@ def process_domain_batch(domain_items, domain):
     """
     strategy = router.get_strategy_config(domain)
     
+    # Batch-retrieve context for all items that need RAG (one embedding call)
+    needs_rag = strategy['use_rag'] and strategy['top_k_docs'] > 0
+    split_items = [(item, *split_context(item['question'])) for item in domain_items]
+    rag_questions = [
+        question_text for _, context, question_text in split_items
+        if needs_rag and not context
+    ]
+    docs_by_question = {}
+    if rag_questions:
+        docs_by_question = dict(zip(
+            rag_questions,
+            retrieve_docs_batch(rag_questions, strategy['top_k_docs'])
+        ))
+    
     # Prepare items for this domain
     prepared_items = []
-    for item in domain_items:
-        question_text = item['question']
+    for item, context, question_text in split_items:
         choices = item['choices']
         
-        # Get context based on domain strategy
-        context = ""
-        if "Đoạn thông tin" in question_text:
-            parts = question_text.split("Câu hỏi:")
-            if len(parts) > 1:
-                context = parts[0].strip()
-                question_text = parts[-1].strip()
-        elif strategy['use_rag'] and strategy['top_k_docs'] > 0:
-            retrieved_docs = rag.query(question_text)
-            retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        # Get context based on domain strategy (embedded passage or RAG)
+        if not context and needs_rag:
+            retrieved_docs = docs_by_question[question_text]
+            context = "\n\n".join(doc.page_content for doc in retrieved_docs)
             
         prepared_items.append({
             'question': question_text,
             'choices': choices,
+            '_choices_str': item.get('_choices_str'),
             'context': context,
             'qid': item['qid']
         })
@@ -487,8 +509,10 @@ def process_domain_batch(domain_items, domain):
     ]
 
     # Call LLM with domain-specific model and temperature
+    # Rate limits (429/503) back off exponentially; parse errors re-ask immediately
+    max_attempts = BATCH_CONFIG.get('max_retries', 2) + 1
     answers = {}
-    for attempt in range(2):
+    for attempt in range(max_attempts):
         try:
             # Add response_format for JSON mode if enabled (not for STEM with reasoning)
             response_format = None
@@ -504,51 +528,53 @@ def process_domain_batch(domain_items, domain):
             
             # STEM: Extract from special format with ===DANH SÁCH ĐÁP ÁN===
             if domain.upper() == "STEM":
-                import re
                 # Find the JSON after ===DANH SÁCH ĐÁP ÁN===
-                match = re.search(r'===DANH SÁCH ĐÁP ÁN===\s*\n?\s*(\{[^}]+\})', raw_answer, re.DOTALL)
+                match = BATCH_ANSWER_LIST_RE.search(raw_answer)
                 if match:
-                    json_str = match.group(1).strip()
-                    answers = json.loads(json_str)
+                    answers = index_batch_answers(parse_json_response(match.group(1)))
                 else:
-                    # Fallback: try to find individual answers
-                    for i in range(1, len(domain_items) + 1):
-                        pattern = rf'===ĐÁP ÁN CÂU {i}===\s*\n?\s*([A-Z])'
-                        ans_match = re.search(pattern, raw_answer)
-                        if ans_match:
-                            answers[str(i)] = ans_match.group(1)
-                        else:
-                            answers[str(i)] = "A"
+                    # Fallback: try to find individual answers (first marker per question)
+                    answers = {}
+                    for num, letter in BATCH_ITEM_ANSWER_RE.findall(raw_answer):
+                        answers.setdefault(int(num), letter)
             else:
                 # Other domains: Parse JSON directly
-                raw_answer = raw_answer.replace("```json", "").replace("```", "").strip()
-                answers = json.loads(raw_answer)
+                answers = index_batch_answers(parse_json_response(raw_answer))
             
-            print(f"  ✓ {domain} batch ({len(domain_items)} questions) processed")
+            logger.info("  ✓ %s batch (%s questions) processed", domain, len(domain_items))
             break
         except Exception as e:
-            print(f"  ✗ Attempt {attempt + 1} failed: {e}")
-            if attempt == 1:
+            logger.warning("  ✗ Attempt %s failed: %s", attempt + 1, e)
+            if attempt < max_attempts - 1:
+                if isinstance(e, RateLimitError):
+                    delay = min(
+                        BATCH_CONFIG.get('retry_backoff', 0.5) * 2 ** attempt,
+                        BATCH_CONFIG.get('retry_backoff_max', 4)
+                    )
+                    logger.warning("  ⏳ Rate limited, retrying in %.1fs...", delay)
+                    time.sleep(delay)
+            else:
                 # Fallback to individual solving
-                print(f"  → Falling back to individual solving...")
+                logger.info("  → Falling back to individual solving...")
                 for i, original_item in enumerate(domain_items, 1):
                     try:
-                        ans = solve_question(original_item)
-                        answers[str(i)] = ans
+                        ans = solve_question(original_item, pre_classified_domain=domain)
+                        answers[i] = ans
                     except Exception as inner_e:
-                        print(f"    Error on {original_item.get('qid')}: {inner_e}")
-                        answers[str(i)] = "A"
+                        logger.warning("    Error on %s: %s", original_item.get('qid'), inner_e)
+                        answers[i] = "A"
     
     # Map answers to QIDs
     results = {}
     for i, item in enumerate(prepared_items, 1):
-        ans = answers.get(str(i), "A")
-        if not ans or ans not in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+        ans = answers.get(i, "A")
+        if ans not in VALID_LETTERS:
             ans = "A"
         results[item['qid']] = ans
     
     return results
 
+
 def solve_batch_streaming(items, output_file):
     """
     Solve questions with streaming write - ghi ngay khi có kết quả
@@ -559,7 +585,7 @@ def solve_batch_streaming(items, output_file):
     # Check which questions already processed
     processed_qids = set()
     if os.path.exists(output_file):
-        print(f"Found existing output file, loading processed questions...")
+        logger.info("Found existing output file, loading processed questions...")
         try:
             with open(output_file, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
@@ -567,9 +593,9 @@ def solve_batch_streaming(items, output_file):
                 for row in reader:
                     if row and len(row) >= 2:
                         processed_qids.add(row[0])
-            print(f"  ✓ Found {len(processed_qids)} already processed questions")
+            logger.info("  ✓ Found %s already processed questions", len(processed_qids))
         except Exception as e:
-            print(f"  ⚠ Error reading existing file: {e}, starting fresh")
+            logger.warning("  ⚠ Error reading existing file: %s, starting fresh", e)
             processed_qids = set()
     
     # Open output file in append mode
@@ -595,10 +621,10 @@ def solve_batch_streaming(items, output_file):
     processed_count = len(processed_qids)
     skipped_count = 0
     
-    print(f"\nProcessing {total_items} questions with streaming write...")
-    print(f"Batch size: {batch_size} (STEM: individual with voting)")
-    print(f"Already completed: {processed_count}/{total_items}")
-    print(f"Will scan all questions from start to ensure no gaps\n")
+    logger.info("\nProcessing %s questions with streaming write...", total_items)
+    logger.info("Batch size: %s (STEM: individual with voting)", batch_size)
+    logger.info("Already completed: %s/%s", processed_count, total_items)
+    logger.info("Will scan all questions from start to ensure no gaps\n")
     
     try:
         for idx, item in enumerate(items, 1):
@@ -608,12 +634,13 @@ def solve_batch_streaming(items, output_file):
             if qid in processed_qids:
                 skipped_count += 1
                 if skipped_count % 50 == 0:  # Progress update every 50 skips
-                    print(f"[{idx}/{total_items}] Scanned {skipped_count} already completed questions...")
+                    logger.info("[%s/%s] Scanned %s already completed questions...", idx, total_items, skipped_count)
                 continue
             
             # Classify domain
-            domain, confidence = router.classify_question(item['question'], item['choices'])
+            domain, confidence = classify_item(item)
             strategy = router.get_strategy_config(domain)
+            item['_choices_str'] = format_choices(item['choices'])
             
             # Check if domain uses batch processing
             use_batch = strategy.get('use_batch_processing', True)
@@ -626,18 +653,18 @@ def solve_batch_streaming(items, output_file):
                 else:
                     method = "single"
                     
-                print(f"[{idx}/{total_items}] {qid} ({domain}) - {method}...", end=' ')
+                logger.info("[%s/%s] %s (%s) - %s...", idx, total_items, qid, domain, method)
                 try:
-                    answer = solve_question(item)
+                    answer = solve_question(item, pre_classified_domain=domain, confidence=confidence)
                     
                     # Write immediately
                     writer.writerow([qid, answer])
                     csv_file.flush()  # Force write to disk
                     processed_qids.add(qid)  # Add to set to avoid re-processing
                     processed_count += 1
-                    print(f"✓ {answer} | Total done: {processed_count}/{total_items}")
+                    logger.info("✓ %s | Total done: %s/%s", answer, processed_count, total_items)
                 except Exception as e:
-                    print(f"✗ Error: {e}")
+                    logger.warning("✗ Error: %s", e)
                     writer.writerow([qid, "A"])  # Fallback
                     csv_file.flush()
                     processed_qids.add(qid)
@@ -653,7 +680,7 @@ def solve_batch_streaming(items, output_file):
             # Process batch when full
             if len(domain_buffers[domain]) >= domain_batch_size:
                 batch_items = domain_buffers[domain][:domain_batch_size]
-                print(f"[{idx}/{total_items}] {domain} batch ({len(batch_items)} questions)...", end=' ')
+                logger.info("[%s/%s] %s batch (%s questions)...", idx, total_items, domain, len(batch_items))
                 
                 try:
                     batch_results = process_domain_batch(batch_items, domain)
@@ -667,9 +694,9 @@ def solve_batch_streaming(items, output_file):
                         processed_count += 1
                     
                     csv_file.flush()  # Force write
-                    print(f"✓ | Total done: {processed_count}/{total_items}")
+                    logger.info("✓ | Total done: %s/%s", processed_count, total_items)
                 except Exception as e:
-                    print(f"✗ Error: {e}")
+                    logger.warning("✗ Error: %s", e)
                     # Write fallback answers
                     for batch_item in batch_items:
                         writer.writerow([batch_item['qid'], "A"])
@@ -681,10 +708,10 @@ def solve_batch_streaming(items, output_file):
                 domain_buffers[domain] = domain_buffers[domain][domain_batch_size:]
         
         # Process remaining items in buffers
-        print(f"\n[{total_items}/{total_items}] Processing remaining questions in buffers...")
+        logger.info("\n[%s/%s] Processing remaining questions in buffers...", total_items, total_items)
         for domain, remaining_items in domain_buffers.items():
             if remaining_items:
-                print(f"  {domain}: {len(remaining_items)} questions...", end=' ')
+                logger.info("  %s: %s questions...", domain, len(remaining_items))
                 
                 # Check if domain uses batch processing
                 domain_config = DOMAIN_CONFIGS.get(domain, {})
@@ -704,9 +731,9 @@ def solve_batch_streaming(items, output_file):
                             processed_count += 1
                         
                         csv_file.flush()
-                        print(f"✓ | Total done: {processed_count}/{total_items}")
+                        logger.info("✓ | Total done: %s/%s", processed_count, total_items)
                     except Exception as e:
-                        print(f"✗ Error: {e}")
+                        logger.warning("✗ Error: %s", e)
                         for item in remaining_items:
                             writer.writerow([item['qid'], "A"])
                             processed_qids.add(item['qid'])
@@ -716,7 +743,7 @@ def solve_batch_streaming(items, output_file):
                     # Process individually (should not happen if logic correct)
                     for item in remaining_items:
                         try:
-                            answer = solve_question(item)
+                            answer = solve_question(item, pre_classified_domain=domain)
                             writer.writerow([item['qid'], answer])
                             processed_qids.add(item['qid'])
                             processed_count += 1
@@ -725,53 +752,36 @@ def solve_batch_streaming(items, output_file):
                             processed_qids.add(item['qid'])
                             processed_count += 1
                     csv_file.flush()
-                    print(f"✓ | Total done: {processed_count}/{total_items}")
+                    logger.info("✓ | Total done: %s/%s", processed_count, total_items)
         
-        print(f"\n{'='*80}")
-        print(f"✓ Completed: {processed_count}/{total_items} questions processed")
+        logger.info("✓ Completed: %s/%s questions processed", processed_count, total_items)
         
-        # Sort output files by qid
-        print(f"\nSorting output files by question ID...")
+        # Put output rows back in input order
+        logger.info("\nSorting output files by input order...")
         try:
             csv_file.close()  # Close first before reading
             
-            # Sort function
-            def get_sort_key(row):
-                qid = row[0]
-                # Extract number from qid like "test_0001" -> 1
-                try:
-                    return int(qid.split('_')[1])
-                except:
-                    return 0
-            
-            # Sort submission.csv
-            with open(output_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                data_rows = list(reader)
-            data_rows.sort(key=get_sort_key)
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                writer.writerows(data_rows)
+            missing = reorder_csv_by_input(output_file, items)
+            if missing:
+                logger.warning("⚠ Warning: Missing results for %s questions", missing)
             
-            print(f"✓ submission.csv sorted successfully")
+            logger.info("✓ submission.csv sorted successfully")
         except Exception as e:
-            print(f"⚠ Warning: Could not sort submission.csv: {e}")
+            logger.warning("⚠ Warning: Could not sort submission.csv: %s", e)
         
     except KeyboardInterrupt:
-        print(f"\n\n⚠ Interrupted by user!")
-        print(f"Progress saved: {processed_count}/{total_items} questions completed")
-        print(f"Resume by running again - already processed questions will be skipped")
+        logger.warning("\n\n⚠ Interrupted by user!")
+        logger.info("Progress saved: %s/%s questions completed", processed_count, total_items)
+        logger.info("Resume by running again - already processed questions will be skipped")
     except Exception as e:
-        print(f"\n\n✗ Error: {e}")
-        print(f"Progress saved: {processed_count}/{total_items} questions completed")
+        logger.warning("\n\n✗ Error: %s", e)
+        logger.info("Progress saved: %s/%s questions completed", processed_count, total_items)
         import traceback
         traceback.print_exc()
     finally:
         if not csv_file.closed:
             csv_file.close()
-        print(f"Output file closed: {output_file}")
+        logger.info("Output file closed: %s", output_file)
 
 
 def solve_batch_streaming_llm(items, output_file):
@@ -796,7 +806,7 @@ def solve_batch_streaming_llm(items, output_file):
     # Check which questions already processed
     processed_qids = set()
     if os.path.exists(output_file):
-        print(f"Found existing output file, loading processed questions...")
+        logger.info("Found existing output file, loading processed questions...")
         try:
             with open(output_file, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
@@ -804,9 +814,9 @@ def solve_batch_streaming_llm(items, output_file):
                 for row in reader:
                     if row and len(row) >= 2:
                         processed_qids.add(row[0])
-            print(f"  ✓ Found {len(processed_qids)} already processed questions")
+            logger.info("  ✓ Found %s already processed questions", len(processed_qids))
         except Exception as e:
-            print(f"  ⚠ Error reading existing file: {e}, starting fresh")
+            logger.warning("  ⚠ Error reading existing file: %s, starting fresh", e)
             processed_qids = set()
     
     # Open output file in append mode
@@ -836,21 +846,15 @@ def solve_batch_streaming_llm(items, output_file):
     non_rag_classified = 0
     
     # Print summary
-    print("="*80)
-    print("OPTIMIZED PROCESSING WITH SMART CLASSIFICATION")
-    print("="*80)
-    print(f"Total questions: {total_items}")
-    print(f"Already completed: {processed_count}")
-    print(f"Classification strategy:")
-    print(f"  - RAG: Keyword detection (no LLM)")
-    print(f"  - Non-RAG: LLM batch classification (10 questions/call)")
-    print("\nDomain processing modes:")
-    for domain_name in DOMAIN_CONFIGS:
-        config = DOMAIN_CONFIGS[domain_name]
-        mode = "Single" if not config.get('use_batch_processing', True) else f"Batch ({config.get('batch_size', 10)})"
-        print(f"  - {domain_name}: {mode}")
-    print("="*80)
-    print()
+    modes = ", ".join(
+        f"{domain_name}: Single" if not domain_config.get('use_batch_processing', True)
+        else f"{domain_name}: Batch ({domain_config.get('batch_size', 10)})"
+        for domain_name, domain_config in DOMAIN_CONFIGS.items()
+    )
+    logger.info("OPTIMIZED PROCESSING WITH SMART CLASSIFICATION | Total questions: %s | Already completed: %s",
+                total_items, processed_count)
+    logger.info("Classification: RAG by keyword detection (no LLM), non-RAG by LLM batch classification (10 questions/call)")
+    logger.info("Domain processing modes: %s", modes)
     
     def process_domain_buffer(domain, buffer_name="domain buffer"):
         """Process a domain buffer when full"""
@@ -871,7 +875,7 @@ def solve_batch_streaming_llm(items, output_file):
             
             if use_batch:
                 # Batch processing
-                print(f"  → {domain} batch ({len(batch_items)} questions)...", end=' ')
+                logger.info("  → %s batch (%s questions)...", domain, len(batch_items))
                 try:
                     batch_results = process_domain_batch(batch_items, domain)
                     
@@ -883,9 +887,9 @@ def solve_batch_streaming_llm(items, output_file):
                         processed_count += 1
                     
                     csv_file.flush()
-                    print(f"✓ | Total: {processed_count}/{total_items}")
+                    logger.info("✓ | Total: %s/%s", processed_count, total_items)
                 except Exception as e:
-                    print(f"✗ Error: {e}")
+                    logger.warning("✗ Error: %s", e)
                     for batch_item in batch_items:
                         writer.writerow([batch_item['qid'], "A"])
                         processed_qids.add(batch_item['qid'])
@@ -896,17 +900,17 @@ def solve_batch_streaming_llm(items, output_file):
                 for item in batch_items:
                     qid = item['qid']
                     method = "verification" if strategy.get('use_self_verification') else "voting" if strategy.get('use_majority_voting') else "single"
-                    print(f"  → {qid} ({domain} - {method})...", end=' ')
+                    logger.info("  → %s (%s - %s)...", qid, domain, method)
                     
                     try:
-                        answer = solve_question(item)
+                        answer = solve_question(item, pre_classified_domain=domain)
                         writer.writerow([qid, answer])
                         processed_qids.add(qid)
                         processed_count += 1
                         csv_file.flush()
-                        print(f"✓ {answer} | Total: {processed_count}/{total_items}")
+                        logger.info("✓ %s | Total: %s/%s", answer, processed_count, total_items)
                     except Exception as e:
-                        print(f"✗ Error: {e}")
+                        logger.warning("✗ Error: %s", e)
                         writer.writerow([qid, "A"])
                         processed_qids.add(qid)
                         processed_count += 1
@@ -922,6 +926,7 @@ def solve_batch_streaming_llm(items, output_file):
                 continue
             
             question_text = item['question']
+            item['_choices_str'] = format_choices(item['choices'])
             
             # Step 1: Quick RAG detection
             if is_rag_question(question_text):
@@ -938,16 +943,16 @@ def solve_batch_streaming_llm(items, output_file):
                     process_domain_buffer('RAG')
                 else:
                     # Process single immediately
-                    print(f"[{idx}/{total_items}] {qid} → RAG (SINGLE)...", end=' ')
+                    logger.info("[%s/%s] %s → RAG (SINGLE)...", idx, total_items, qid)
                     try:
-                        answer = solve_single_question(item, 'RAG')
+                        answer = solve_question(item, pre_classified_domain='RAG')
                         writer.writerow([qid, answer])
                         processed_qids.add(qid)
                         processed_count += 1
                         csv_file.flush()
-                        print(f"✓ | Total: {processed_count}/{total_items}")
+                        logger.info("✓ | Total: %s/%s", processed_count, total_items)
                     except Exception as e:
-                        print(f"✗ Error: {e}")
+                        logger.warning("✗ Error: %s", e)
                         writer.writerow([qid, 'A'])
                         processed_qids.add(qid)
                         processed_count += 1
@@ -961,9 +966,8 @@ def solve_batch_streaming_llm(items, output_file):
                     batch_to_classify = non_rag_buffer[:classification_batch_size]
                     non_rag_buffer = non_rag_buffer[classification_batch_size:]
                     
-                    print(f"[{idx}/{total_items}] Classifying {len(batch_to_classify)} non-RAG questions with LLM...", end=' ')
+                    logger.info("[%s/%s] Classifying %s non-RAG questions with LLM...", idx, total_items, len(batch_to_classify))
                     classifications = classify_questions_with_llm(batch_to_classify)
-                    print(f"✓")
                     
                     non_rag_classified += len(batch_to_classify)
                     
@@ -981,16 +985,15 @@ def solve_batch_streaming_llm(items, output_file):
                             domain_buffers[domain].append(item_to_classify)
                         else:
                             # Process single immediately
-                            print(f"  → {classified_qid} classified as {domain} (SINGLE)...", end=' ')
+                            logger.info("  → %s classified as %s (SINGLE)...", classified_qid, domain)
                             try:
-                                answer = solve_single_question(item_to_classify, domain)
+                                answer = solve_question(item_to_classify, pre_classified_domain=domain)
                                 writer.writerow([classified_qid, answer])
                                 processed_qids.add(classified_qid)
                                 processed_count += 1
                                 csv_file.flush()
-                                print(f"✓")
                             except Exception as e:
-                                print(f"✗ Error: {e}")
+                                logger.warning("✗ Error: %s", e)
                                 writer.writerow([classified_qid, 'A'])
                                 processed_qids.add(classified_qid)
                                 processed_count += 1
@@ -1002,9 +1005,8 @@ def solve_batch_streaming_llm(items, output_file):
         
         # Classify remaining non-RAG buffer
         if non_rag_buffer:
-            print(f"\nClassifying {len(non_rag_buffer)} remaining non-RAG questions...", end=' ')
+            logger.info("\nClassifying %s remaining non-RAG questions...", len(non_rag_buffer))
             classifications = classify_questions_with_llm(non_rag_buffer)
-            print(f"✓")
             
             non_rag_classified += len(non_rag_buffer)
             
@@ -1022,31 +1024,28 @@ def solve_batch_streaming_llm(items, output_file):
                     domain_buffers[domain].append(item_to_classify)
                 else:
                     # Process single immediately
-                    print(f"  → {classified_qid} classified as {domain} (SINGLE)...", end=' ')
+                    logger.info("  → %s classified as %s (SINGLE)...", classified_qid, domain)
                     try:
-                        answer = solve_single_question(item_to_classify, domain)
+                        answer = solve_question(item_to_classify, pre_classified_domain=domain)
                         writer.writerow([classified_qid, answer])
                         processed_qids.add(classified_qid)
                         processed_count += 1
                         csv_file.flush()
-                        print(f"✓")
                     except Exception as e:
-                        print(f"✗ Error: {e}")
+                        logger.warning("✗ Error: %s", e)
                         writer.writerow([classified_qid, 'A'])
                         processed_qids.add(classified_qid)
                         processed_count += 1
                         csv_file.flush()
         
         # Step 5: Flush remaining domain buffers
-        print(f"\n{'='*80}")
-        print("Processing remaining questions in domain buffers...")
-        print(f"{'='*80}")
+        logger.info("Processing remaining questions in domain buffers...")
         
         for domain, remaining_items in domain_buffers.items():
             if not remaining_items:
                 continue
             
-            print(f"\n{domain}: {len(remaining_items)} questions")
+            logger.info("\n%s: %s questions", domain, len(remaining_items))
             strategy = DOMAIN_CONFIGS.get(domain, {})
             use_batch = strategy.get('use_batch_processing', True)
             
@@ -1063,9 +1062,9 @@ def solve_batch_streaming_llm(items, output_file):
                         processed_count += 1
                     
                     csv_file.flush()
-                    print(f"  ✓ Processed {len(remaining_items)} questions")
+                    logger.info("  ✓ Processed %s questions", len(remaining_items))
                 except Exception as e:
-                    print(f"  ✗ Error: {e}")
+                    logger.warning("  ✗ Error: %s", e)
                     for item in remaining_items:
                         writer.writerow([item['qid'], "A"])
                         processed_qids.add(item['qid'])
@@ -1075,7 +1074,7 @@ def solve_batch_streaming_llm(items, output_file):
                 # Single process remaining
                 for item in remaining_items:
                     try:
-                        answer = solve_question(item)
+                        answer = solve_question(item, pre_classified_domain=domain)
                         writer.writerow([item['qid'], answer])
                         processed_qids.add(item['qid'])
                         processed_count += 1
@@ -1084,90 +1083,96 @@ def solve_batch_streaming_llm(items, output_file):
                         processed_qids.add(item['qid'])
                         processed_count += 1
                 csv_file.flush()
-                print(f"  ✓ Processed {len(remaining_items)} questions")
+                logger.info("  ✓ Processed %s questions", len(remaining_items))
         
-        print(f"\n{'='*80}")
-        print(f"✓ Completed: {processed_count}/{total_items} questions processed")
-        print(f"\nClassification stats:")
-        print(f"  - RAG detected by keywords: {rag_detected}")
-        print(f"  - Non-RAG classified by LLM: {non_rag_classified}")
-        print(f"  - LLM API calls saved: ~{rag_detected // 10} calls")
-        print(f"{'='*80}")
+        logger.info("✓ Completed: %s/%s questions processed", processed_count, total_items)
+        logger.info("\nClassification stats:")
+        logger.info("  - RAG detected by keywords: %s", rag_detected)
+        logger.info("  - Non-RAG classified by LLM: %s", non_rag_classified)
+        logger.info("  - LLM API calls saved: ~%s calls", rag_detected // 10)
         
     except KeyboardInterrupt:
-        print(f"\n\n⚠ Interrupted by user!")
-        print(f"Progress saved: {processed_count}/{total_items} questions completed")
+        logger.warning("\n\n⚠ Interrupted by user!")
+        logger.info("Progress saved: %s/%s questions completed", processed_count, total_items)
     except Exception as e:
-        print(f"\n\n✗ Error: {e}")
-        print(f"Progress saved: {processed_count}/{total_items} questions completed")
+        logger.warning("\n\n✗ Error: %s", e)
+        logger.info("Progress saved: %s/%s questions completed", processed_count, total_items)
         import traceback
         traceback.print_exc()
     finally:
         if not csv_file.closed:
             csv_file.close()
-        print(f"Output file closed: {output_file}")
+        logger.info("Output file closed: %s", output_file)
 
 
 def solve_batch(items):
     """
-    Solve a batch of questions with domain-aware streaming batching
+    Solve a batch of questions with domain-aware batching
     STEM: Process individually with majority voting
-    Other domains: Batch when reaching batch_size questions
+    Other domains: Split into batch_size chunks per domain
+    
+    Two passes: classify + bucket every item by domain, then run all
+    domain chunks (and STEM questions) concurrently in a thread pool.
     
     Note: This is the old non-streaming version, kept for compatibility
     Use solve_batch_streaming() for production
     """
-    from config import BATCH_CONFIG
-    
-    # Domain buffers to accumulate questions (excluding STEM)
-    domain_buffers = {
-        "PRECISION_CRITICAL": [],
-        "COMPULSORY": [],
-        "RAG": [],
-        "MULTIDOMAIN": []
-    }
+    from config import BATCH_CONFIG, PARALLEL_CONFIG
     
     all_results = {}
     batch_size = BATCH_CONFIG['batch_size']  # Default 10
     
-    print(f"Processing {len(items)} questions with streaming domain batching...")
-    print(f"Batch size: {batch_size} questions per domain (STEM: individual with voting)\n")
+    logger.info("Processing %s questions with domain batching...", len(items))
+    logger.info("Batch size: %s questions per domain (STEM: individual with voting)\n", batch_size)
     
-    # Process items one by one, classify and group
-    for idx, item in enumerate(items, 1):
-        # Classify into domain
-        domain, confidence = router.classify_question(item['question'], item['choices'])
-        
-        # STEM: Process individually with majority voting
+    # Pass 1: Classify every item once, pre-format its choices and bucket by domain
+    classified = list(zip(items, classify_items(items)))
+    for item, _ in classified:
+        item['_choices_str'] = format_choices(item['choices'])
+    buckets = defaultdict(list)
+    stem_items = []
+    for item, (domain, confidence) in classified:
         if domain == "STEM":
-            print(f"[{idx}/{len(items)}] STEM question detected, processing with majority voting...")
-            strategy = router.get_strategy_config(domain)
-            answer = solve_stem_with_voting(item, strategy, domain, confidence)
-            all_results[item['qid']] = answer
-            continue
-        
-        # Add to domain buffer for batch processing
-        domain_buffers[domain].append(item)
-        
-        # Check if this domain buffer is full
-        if len(domain_buffers[domain]) >= batch_size:
-            print(f"[{idx}/{len(items)}] {domain} buffer full ({batch_size} questions), processing batch...")
-            
-            # Process this domain batch
-            batch_to_process = domain_buffers[domain][:batch_size]
-            batch_results = process_domain_batch(batch_to_process, domain)
-            all_results.update(batch_results)
-            
-            # Reset buffer for this domain
-            domain_buffers[domain] = []
+            stem_items.append((item, confidence))
+        else:
+            buckets[domain].append(item)
     
-    # Process remaining items in buffers (excluding STEM)
-    print(f"\n[{len(items)}/{len(items)}] Processing remaining questions...")
-    for domain, remaining_items in domain_buffers.items():
-        if remaining_items:
-            print(f"  {domain}: {len(remaining_items)} questions remaining")
-            batch_results = process_domain_batch(remaining_items, domain)
-            all_results.update(batch_results)
+    # Pass 2: Slice each domain into contiguous batch_size chunks
+    chunks = [
+        (domain, domain_items[i:i + batch_size])
+        for domain, domain_items in buckets.items()
+        for i in range(0, len(domain_items), batch_size)
+    ]
+    
+    for domain, domain_items in buckets.items():
+        logger.info("  %s: %s questions", domain, len(domain_items))
+    logger.info("  STEM: %s questions", len(stem_items))
+    logger.info("Dispatching %s domain batches + %s STEM questions...", len(chunks), len(stem_items))
+    
+    num_tasks = len(chunks) + len(stem_items)
+    if not num_tasks:
+        return all_results
+    
+    max_workers = min(num_tasks, PARALLEL_CONFIG.get('max_workers', 8))
+    stem_strategy = router.get_strategy_config("STEM")
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(process_domain_batch, chunk_items, domain)
+            for domain, chunk_items in chunks
+        ]
+        # STEM: individual solving with majority voting
+        stem_futures = {
+            executor.submit(solve_stem_with_voting, item, stem_strategy, "STEM", confidence): item['qid']
+            for item, confidence in stem_items
+        }
+        
+        # Merge results in completion order
+        for future in as_completed(futures + list(stem_futures)):
+            if future in stem_futures:
+                all_results[stem_futures[future]] = future.result() or "A"
+            else:
+                all_results.update(future.result())
     
     return all_results
 
@@ -1189,19 +1194,14 @@ def main():
         with open(input_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        print(f"Input: {input_path}")
-        print(f"Output: {output_path}")
-        print(f"Total questions: {len(data)}")
-        print("="*80)
+        logger.info("Input: %s | Output: %s | Total questions: %s", input_path, output_path, len(data))
         
         # Use streaming batch processing with auto-save
         solve_batch_streaming(data, output_path)
         
-        print("\n" + "="*80)
-        print(f"✓ All done! Output saved to: {output_path}")
-        print("="*80)
+        logger.info("\n✓ All done! Output saved to: %s", output_path)
     else:
-        print(f"Error: Input file not found: {input_path}")
+        logger.error("Error: Input file not found: %s", input_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
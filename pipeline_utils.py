@@ -0,0 +1,409 @@
+"""
+pipeline_utils.py - Helpers shared by main.py and predict.py
+
+Lazy RAG / router / semantic-cache singletons, the retrieval, answer and
+classification caches, answer parsing and CSV reordering. Both entry points
+import them from here, so a fix lands in one place.
+"""
+
+import csv
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+
+try:
+    import orjson  # Faster JSON parsing for batch responses
+except ImportError:
+    orjson = None
+
+try:
+    from diskcache import Cache  # Persistent answer cache
+except ImportError:
+    Cache = None
+
+import config
+import prompt_templates
+from config import CACHE_CONFIG
+from router_logic import QuestionRouter
+
+# ============================================================================
+# LAZY SINGLETONS (heavy init only when first needed)
+# ============================================================================
+
+_singleton_lock = threading.RLock()
+
+
+def _singleton(factory):
+    """Cache a zero-arg factory; built at most once even if threads race on the first call"""
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with _singleton_lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    return get
+
+
+@_singleton
+def get_rag():
+    """RAG pipeline singleton (imports LangChain/Chroma and loads BM25 + Vector on first call)"""
+    from rag_langchain import LangChainRAG
+
+    rag = LangChainRAG()
+    # Ensure retriever is ready (loads BM25 + Vector)
+    rag.setup_retriever()
+    return rag
+
+
+@_singleton
+def get_router():
+    """Rule-based question router singleton"""
+    return QuestionRouter()
+
+
+@_singleton
+def get_semantic_cache():
+    """Semantic retrieval cache singleton (None when disabled in CACHE_CONFIG)"""
+    if not CACHE_CONFIG.get('use_semantic_cache', False):
+        return None
+    from semantic_cache import SemanticCache
+
+    return SemanticCache(
+        nbits=CACHE_CONFIG.get('semantic_nbits', 8),
+        num_tables=CACHE_CONFIG.get('semantic_tables', 4),
+        threshold=CACHE_CONFIG.get('semantic_threshold', 0.95),
+        max_entries=CACHE_CONFIG.get('semantic_max_entries', 4096),
+    )
+
+
+# ============================================================================
+# RETRIEVAL CACHE
+# ============================================================================
+
+_RETRIEVAL_CACHE_SIZE = 4096
+_retrieval_cache = {}  # normalized question -> tuple of retrieved docs
+_retrieval_lock = threading.Lock()  # Shared by worker threads (insert / evict / read)
+
+
+def _normalize_query(question_text):
+    """Whitespace-collapsed key (BM25 tokenizes on whitespace, so results are identical)"""
+    return " ".join(question_text.split())
+
+
+def _cache_docs(qkey, docs):
+    """Store retrieval result (evicting the oldest entry when full) and return it"""
+    docs = tuple(docs)
+    with _retrieval_lock:
+        if qkey not in _retrieval_cache and len(_retrieval_cache) >= _RETRIEVAL_CACHE_SIZE:
+            _retrieval_cache.pop(next(iter(_retrieval_cache)), None)
+        _retrieval_cache[qkey] = docs
+    return docs
+
+
+def _retrieve_uncached(qkey, embedding=None):
+    """
+    Semantic cache lookup, then hybrid retrieval on miss
+    The question embedding is reused for the vector search, so a miss costs no extra API call
+    """
+    rag = get_rag()
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is None:
+        return rag.query(qkey)
+
+    if embedding is None:
+        embedding = rag.embed_query(qkey)
+    if not embedding:
+        # Embedding API failed -> plain retrieval
+        return rag.query(qkey)
+
+    generation = semantic_cache.generation  # put() is dropped if the index is invalidated meanwhile
+    docs = semantic_cache.get(embedding)
+    if docs is None:
+        docs = rag.query_by_embedding(qkey, embedding)
+        semantic_cache.put(embedding, tuple(docs), generation=generation)
+    return docs
+
+
+def retrieve_docs(question_text, top_k):
+    """
+    Retrieve top_k documents for a question, reusing results for repeated questions
+    """
+    qkey = _normalize_query(question_text)
+    with _retrieval_lock:
+        docs = _retrieval_cache.get(qkey)
+    if docs is None:
+        docs = _cache_docs(qkey, _retrieve_uncached(qkey))
+    return list(docs[:top_k])
+
+
+def retrieve_docs_batch(questions, top_k):
+    """
+    Retrieve top_k documents for many questions with one batched RAG call
+    Only questions not already cached are retrieved (embedded together in one call)
+    """
+    qkeys = [_normalize_query(q) for q in questions]
+    with _retrieval_lock:
+        found = {k: _retrieval_cache[k] for k in qkeys if k in _retrieval_cache}
+    misses = list(dict.fromkeys(k for k in qkeys if k not in found))
+    if misses:
+        if get_semantic_cache() is None:
+            batch_docs = get_rag().query_batch(misses)
+        else:
+            embeddings = get_rag().embed_queries(misses)
+            batch_docs = [_retrieve_uncached(k, e) for k, e in zip(misses, embeddings)]
+        for qkey, docs in zip(misses, batch_docs):
+            found[qkey] = _cache_docs(qkey, docs)
+    return [list(found[k][:top_k]) for k in qkeys]
+
+
+def clear_retrieval_cache():
+    """Drop cached retrieval results (call after the vector DB / BM25 index is rebuilt)"""
+    with _retrieval_lock:
+        _retrieval_cache.clear()
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_cache.invalidate()
+
+
+# ============================================================================
+# ANSWER CACHE (exact-duplicate questions)
+# ============================================================================
+
+ANSWER_CACHE_ENABLED = (
+    CACHE_CONFIG.get('use_answer_cache', False)
+    and os.environ.get('ANSWER_CACHE', '1') != '0'
+)
+
+_answer_cache = None  # Opened on first use (see _get_answer_cache)
+_answer_cache_lock = threading.Lock()
+
+
+def _answer_cache_version():
+    """
+    Fingerprint of everything that shapes an answer: prompt templates, config
+    (models, temperatures, RAG settings) and CACHE_CONFIG['answer_cache_version']
+    Any change yields new keys, so stale answers from an old setup are never reused
+    """
+    settings = {
+        'config': {k: v for k, v in vars(config).items() if k.isupper()},
+        'prompts': {k: v for k, v in vars(prompt_templates).items() if k.isupper()},
+    }
+    blob = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+_ANSWER_CACHE_VERSION = _answer_cache_version() if ANSWER_CACHE_ENABLED else None
+
+
+def _get_answer_cache():
+    """Open the answer cache: disk-backed when diskcache is installed (survives re-runs), in-memory otherwise"""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            if Cache is not None:
+                _answer_cache = Cache(CACHE_CONFIG.get('answer_cache_dir', './.answer_cache'))
+            else:
+                _answer_cache = {}
+        return _answer_cache
+
+
+def answer_cache_key(item, domain, entry_point):
+    """
+    Stable key for a question: sha256 of config version + entry point + domain + question text + choices
+    entry_point keeps main.py and predict.py answers apart (their solve paths differ)
+    Returns None when the answer cache is disabled
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    text = '|'.join([_ANSWER_CACHE_VERSION, entry_point, domain, item['question']] + [str(choice) for choice in item['choices']])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def lookup_answer(cache_key):
+    """Return the stored answer for cache_key, or None (also when caching is disabled)"""
+    if cache_key is None:
+        return None
+    return _get_answer_cache().get(cache_key)
+
+
+def remember_answer(cache_key, answer):
+    """
+    Store answer under cache_key (no-op when caching is disabled)
+    answer=None marks a failed solve: it is not cached and the default "A" is returned
+    """
+    if answer is None:
+        return "A"
+    if cache_key is not None:
+        _get_answer_cache()[cache_key] = answer
+    return answer
+
+
+# ============================================================================
+# CLASSIFICATION CACHE
+# ============================================================================
+
+_classification_cache = {}  # qid -> (domain, confidence) from the rule-based router
+
+
+def classify_item(item):
+    """
+    Classify an item with the rule-based router, once per qid
+    Returns: (domain_name, confidence_score)
+    """
+    qid = item.get('qid')
+    if qid is not None and qid in _classification_cache:
+        return _classification_cache[qid]
+
+    result = get_router().classify_question(item['question'], item.get('choices', []))
+    if qid is not None:
+        _classification_cache[qid] = result
+    return result
+
+
+def classify_items(items):
+    """
+    Classify many items with one router.classify_batch pass, reusing cached qids
+    Returns: list of (domain_name, confidence_score) in item order
+    """
+    results = [None] * len(items)
+    pending = []
+    for i, item in enumerate(items):
+        qid = item.get('qid')
+        if qid is not None and qid in _classification_cache:
+            results[i] = _classification_cache[qid]
+        else:
+            pending.append(i)
+
+    if pending:
+        batch_results = get_router().classify_batch(
+            [items[i]['question'] for i in pending],
+            [items[i].get('choices', []) for i in pending]
+        )
+        for i, result in zip(pending, batch_results):
+            results[i] = result
+            qid = items[i].get('qid')
+            if qid is not None:
+                _classification_cache[qid] = result
+    return results
+
+
+def split_context(question_text):
+    """
+    Split an embedded-passage question into (context, question) with one rpartition
+    Only questions carrying an "Đoạn thông tin" passage are split; returns
+    ("", question_text) otherwise or when there is no "Câu hỏi:" marker.
+    The question is the text after the last "Câu hỏi:"; everything before it
+    (including any earlier "Câu hỏi:") is the context
+    """
+    if "Đoạn thông tin" not in question_text:
+        return "", question_text
+    head, sep, tail = question_text.rpartition("Câu hỏi:")
+    if sep:
+        return head.strip(), tail.strip()
+    return "", question_text
+
+
+# ============================================================================
+# ANSWER EXTRACTION PATTERNS (compiled once)
+# ============================================================================
+
+FINAL_ANSWER_RE = re.compile(r'===ĐÁP ÁN CUỐI CÙNG===\s*([A-Z])', re.IGNORECASE)
+VOTING_ANSWER_RE = re.compile(r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)', re.IGNORECASE)
+STANDALONE_LETTER_RE = re.compile(r'\b([A-Z])\b')
+VERIFIED_RE = re.compile(r'\bĐÚNG\b', re.IGNORECASE)
+BATCH_ANSWER_LIST_RE = re.compile(r'===DANH SÁCH ĐÁP ÁN===\s*\n?\s*(\{[^}]+\})', re.DOTALL)
+BATCH_ITEM_ANSWER_RE = re.compile(r'===ĐÁP ÁN CÂU (\d+)===\s*\n?\s*([A-Z])')
+VALID_LETTERS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+# Single-scan answer extraction: final marker | answer marker | standalone letter
+_ANSWER_SCAN_RE = re.compile(
+    r'(?i:===ĐÁP ÁN CUỐI CÙNG===\s*(?P<final>[A-Z]))'
+    r'|(?i:(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời|[Kk]ết quả)\s*[:\-]?\s*(?P<marked>[A-Z])(?:[.\s]|$))'
+    r'|\b(?P<standalone>[A-Z])\b'
+)
+_JSON_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+
+def parse_json_response(raw_text):
+    """
+    Strip markdown code fences from an LLM response and parse it as JSON
+    Uses orjson when installed, stdlib json otherwise (and as fallback)
+    """
+    raw = _JSON_FENCE_RE.sub('', raw_text).strip()
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def index_batch_answers(parsed):
+    """
+    Key parsed batch answers by 1-based int question number
+    Non-numeric keys and non-string values are dropped
+    """
+    if not isinstance(parsed, dict):
+        return {}
+    return {int(k): v for k, v in parsed.items() if str(k).isdigit() and isinstance(v, str)}
+
+
+def extract_answer_letter(raw_answer):
+    """
+    Extract the answer letter from a single-question response in one left-to-right scan
+    Priority: ===ĐÁP ÁN CUỐI CÙNG=== marker > first answer marker > last standalone letter
+    """
+    marked = standalone = None
+    for match in _ANSWER_SCAN_RE.finditer(raw_answer):
+        kind = match.lastgroup
+        if kind == 'final':
+            return match.group('final').upper()
+        if kind == 'marked':
+            if marked is None:
+                marked = match.group('marked')
+        else:
+            standalone = match.group('standalone')
+
+    letter = marked or standalone
+    return letter.upper() if letter else "A"
+
+
+# ============================================================================
+# OUTPUT FILES
+# ============================================================================
+
+def reorder_csv_by_input(path, items):
+    """
+    Rewrite a result CSV so its rows follow the input order of items
+    If the file holds several rows for a qid, the last one wins (a question retried
+    on resume replaces its earlier fallback row). Duplicate qids in items each get
+    that row. Rows whose qid is not in items are kept at the end.
+    Returns the number of items that have no row in the file
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = {row[0]: row for row in reader if row}  # last row per qid
+
+    ordered_rows = []
+    seen_qids = set()
+    missing = 0
+    for item in items:
+        row = rows.get(item['qid'])
+        if row is None:
+            missing += 1
+        else:
+            ordered_rows.append(row)
+            seen_qids.add(item['qid'])
+    ordered_rows.extend(row for qid, row in rows.items() if qid not in seen_qids)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(ordered_rows)
+    return missing
@@ -2,35 +2,42 @@
 predict.py - Entry point for VNPT AI Competition
 Reads from /code/private_test.json and outputs submission.csv, submission_time.csv
 
-This file contains ALL logic from main.py, only modified for BTC requirements:
+This file mirrors main.py (shared helpers live in pipeline_utils.py), only modified for BTC requirements:
 - Read from /code/private_test.json
 - Output to /code/submission.csv and /code/submission_time.csv
 - Track timing per question in a loop
-- Retry API calls every 1 minute on error (no fallback to 'A')
+- Retry API calls until they succeed (no fallback to 'A'): exponential backoff on
+  rate limits (429/503), every 1 minute on other errors
 """
 
 import json
 import csv
-import re
 import os
 import time
-from rag_langchain import LangChainRAG
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from prompt_templates import (
-    construct_prompt, construct_batch_prompt,
+    construct_prompt, construct_batch_prompt, format_choices,
     SYSTEM_PROMPTS, BATCH_SYSTEM_PROMPT,
     CLASSIFICATION_SYSTEM_PROMPT, CLASSIFICATION_USER_TEMPLATE
 )
-from get_response import get_response
+from get_response import get_response, RateLimitError
 from get_embedding import get_embedding
-from router_logic import QuestionRouter
-from config import DOMAIN_CONFIGS
+from pipeline_utils import (
+    get_rag, get_router, get_semantic_cache, retrieve_docs, retrieve_docs_batch,
+    answer_cache_key, lookup_answer, remember_answer,
+    classify_item, classify_items, split_context,
+    FINAL_ANSWER_RE, VOTING_ANSWER_RE, STANDALONE_LETTER_RE, VERIFIED_RE,
+    BATCH_ANSWER_LIST_RE, BATCH_ITEM_ANSWER_RE, VALID_LETTERS,
+    parse_json_response, index_batch_answers, extract_answer_letter,
+    reorder_csv_by_input
+)
+from config import DOMAIN_CONFIGS, PARALLEL_CONFIG, BATCH_CONFIG
+from logger_setup import get_logger
 
-# Initialize RAG Pipeline and Router
-rag = LangChainRAG()
-router = QuestionRouter()
+logger = get_logger()
 
-# Ensure retriever is ready (loads BM25 + Vector)
-rag.setup_retriever()
+_ENTRY_POINT = os.path.basename(__file__)  # Keeps answer-cache keys apart from main.py
 
 
 def is_rag_question(question_text):
@@ -53,10 +60,13 @@ def is_rag_question(question_text):
 def get_response_with_retry(messages, model='small', temperature=0.3, n=1, response_format=None, retry_delay=60):
     """
     Call LLM API with automatic retry on failure
-    Retries every {retry_delay} seconds until success
+    Retries until success: every {retry_delay} seconds on errors, with exponential
+    backoff on rate limits
     
     Special handling:
     - ContentPolicyError: Don't retry, propagate immediately (for PRECISION_CRITICAL)
+    - RateLimitError (429/503): wait BATCH_CONFIG['retry_backoff'], doubling per
+      consecutive rate limit, capped at BATCH_CONFIG['retry_backoff_max']
     
     Args:
         messages: List of message dicts
@@ -72,6 +82,7 @@ def get_response_with_retry(messages, model='small', temperature=0.3, n=1, respo
     from get_response import ContentPolicyError
     
     attempt = 0
+    rate_limited = 0  # Consecutive rate-limit responses (drives the backoff)
     while True:
         attempt += 1
         try:
@@ -85,13 +96,23 @@ def get_response_with_retry(messages, model='small', temperature=0.3, n=1, respo
             return response
         except ContentPolicyError as e:
             # Don't retry content policy violations - these won't succeed
-            print(f"\n  ⚠ Content policy violation: {e}")
+            logger.warning("\n  ⚠ Content policy violation: %s", e)
             raise
+        except RateLimitError as e:
+            delay = min(
+                BATCH_CONFIG.get('retry_backoff', 0.5) * 2 ** rate_limited,
+                BATCH_CONFIG.get('retry_backoff_max', 4)
+            )
+            rate_limited += 1
+            logger.warning("\n  ⚠ Rate limited (attempt %s): %s", attempt, e)
+            logger.warning("  ⏳ Waiting %.1f seconds before retry...", delay)
+            time.sleep(delay)
         except Exception as e:
-            print(f"\n  ⚠ API call failed (attempt {attempt}): {e}")
-            print(f"  ⏳ Waiting {retry_delay} seconds before retry...")
+            rate_limited = 0
+            logger.warning("\n  ⚠ API call failed (attempt %s): %s", attempt, e)
+            logger.warning("  ⏳ Waiting %s seconds before retry...", retry_delay)
             time.sleep(retry_delay)
-            print(f"  🔄 Retrying (attempt {attempt + 1})...")
+            logger.info("  🔄 Retrying (attempt %s)...", attempt + 1)
 
 
 # ============================================================================
@@ -161,8 +182,7 @@ def classify_questions_with_llm(questions_batch):
         )
         
         # Parse JSON response
-        response = response.replace("```json", "").replace("```", "").strip()
-        classifications = json.loads(response)
+        classifications = parse_json_response(response)
         
         # Map back to qids
         results = {}
@@ -177,22 +197,22 @@ def classify_questions_with_llm(questions_batch):
         return results
         
     except Exception as e:
-        print(f"  ⚠ LLM classification failed: {e}, falling back to rule-based")
+        logger.warning("  ⚠ LLM classification failed: %s, falling back to rule-based", e)
         # Fallback to rule-based router
-        results = {}
-        for item in questions_batch:
-            domain, _ = router.classify_question(item['question'], item.get('choices', []))
-            results[item['qid']] = domain
-        return results
+        return {
+            item['qid']: domain
+            for item, (domain, _) in zip(questions_batch, classify_items(questions_batch))
+        }
 
 
-def solve_question(item, pre_classified_domain=None):
+def solve_question(item, pre_classified_domain=None, confidence=None):
     """
     Solve a single question with domain-aware routing
     
     Args:
         item: Question item dict
         pre_classified_domain: Domain already classified by LLM (skip re-classification)
+        confidence: Confidence of the upstream classification (default 1.0)
     """
     question_text = item['question']
     choices = item['choices']
@@ -200,41 +220,42 @@ def solve_question(item, pre_classified_domain=None):
     # 1. Use pre-classified domain or classify with router
     if pre_classified_domain:
         domain = pre_classified_domain
-        confidence = 1.0  # High confidence for LLM classification
+        confidence = 1.0 if confidence is None else confidence  # High confidence for LLM classification
     else:
-        domain, confidence = router.classify_question(question_text, choices)
+        domain, confidence = classify_item(item)
     
-    strategy = router.get_strategy_config(domain)
+    # Exact-duplicate question (same domain and setup): reuse the stored answer
+    cache_key = answer_cache_key(item, domain, _ENTRY_POINT)
+    cached_answer = lookup_answer(cache_key)
+    if cached_answer is not None:
+        logger.info("  Cache hit: %s -> %s", item.get('qid'), cached_answer)
+        return cached_answer
+    
+    strategy = get_router().get_strategy_config(domain)
     
     # Debug: print STEM strategy
     if domain == "STEM":
-        print(f"  [DEBUG] STEM config: voting={strategy.get('use_majority_voting')}, verification={strategy.get('use_self_verification')}")
+        logger.debug("  [DEBUG] STEM config: voting=%s, verification=%s", strategy.get('use_majority_voting'), strategy.get('use_self_verification'))
     
     # STEM with self-verification (if enabled)
     if domain == "STEM" and strategy.get('use_self_verification', False):
-        return solve_stem_with_self_verification(item, strategy, domain, confidence)
+        return remember_answer(cache_key, solve_stem_with_self_verification(item, strategy, domain, confidence))
     
     # STEM with majority voting (default)
     if domain == "STEM" and strategy.get('use_majority_voting', False):
-        return solve_stem_with_voting(item, strategy, domain, confidence)
+        return remember_answer(cache_key, solve_stem_with_voting(item, strategy, domain, confidence))
     
     # 2. Get context based on domain strategy
-    context = ""
-    if "Đoạn thông tin" in question_text:
-        # Extract context from question (RAG domain)
-        parts = question_text.split("Câu hỏi:")
-        if len(parts) > 1:
-            context = parts[0].strip()
-            question_text = parts[-1].strip()
-    elif strategy['use_rag'] and strategy['top_k_docs'] > 0:
+    # Extract context embedded in the question (RAG domain)
+    context, question_text = split_context(question_text)
+    if not context and strategy['use_rag'] and strategy['top_k_docs'] > 0:
         # Use RAG retrieval for other domains if configured
-        retrieved_docs = rag.query(question_text)
-        # Limit to top_k_docs if needed
-        retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+        context = "\n\n".join(doc.page_content for doc in retrieved_docs)
     
     # 3. Construct domain-specific prompt
-    prompt = construct_prompt(question_text, choices, context, domain.lower())
+    prompt = construct_prompt(question_text, choices, context, domain.lower(),
+                              choices_str=item.get('_choices_str'))
     
     # 4. Call LLM with domain-specific system prompt
     system_prompt = SYSTEM_PROMPTS.get(
@@ -264,11 +285,11 @@ def solve_question(item, pre_classified_domain=None):
                 choice_lower = choice.lower()
                 if any(keyword in choice_lower for keyword in rejection_keywords):
                     answer = chr(ord('A') + idx)  # Convert index to letter (0→A, 1→B, etc.)
-                    print(f"  ⚠ API rejected content (PRECISION_CRITICAL) → Found answer: {answer} ('{choice[:50]}...')")
+                    logger.warning("  ⚠ API rejected content (PRECISION_CRITICAL) → Found answer: %s ('%s...')", answer, choice[:50])
                     return answer
             
             # If no rejection keyword found, use first choice as safe default
-            print(f"  ⚠ API rejected content (PRECISION_CRITICAL) → No rejection keyword found, defaulting to A")
+            logger.warning("  ⚠ API rejected content (PRECISION_CRITICAL) → No rejection keyword found, defaulting to A")
             return "A"
         # Re-raise for other errors
         raise
@@ -278,35 +299,23 @@ def solve_question(item, pre_classified_domain=None):
     num_choices = len(choices)
     max_valid_letter = chr(ord('A') + num_choices - 1)  # A + 0 = A, A + 5 = F, etc.
     
-    # Try to find answer after === marker first (new format)
-    match = re.search(r'===ĐÁP ÁN CUỐI CÙNG===\s*([A-Z])', raw_answer, re.IGNORECASE)
-    
-    if match:
-        answer = match.group(1).upper()
-    else:
-        # Fallback 1: find answer markers with dots or colons
-        answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời|[Kk]ết quả)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-        match = re.search(answer_pattern, raw_answer, re.IGNORECASE)
-        
-        if match:
-            answer = match.group(1).upper()
-        else:
-            # Fallback 2: find last standalone letter (not first!)
-            matches = re.findall(r'\b([A-Z])\b', raw_answer)
-            answer = matches[-1].upper() if matches else "A"
+    # Single scan: === marker first (new format), then answer markers,
+    # then last standalone letter (not first!)
+    answer = extract_answer_letter(raw_answer)
     
     # Validate: answer must be within valid range for this question
     if answer not in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
-        print(f"  Warning: Invalid answer '{answer}' (not a letter), defaulting to A")
+        logger.warning("  Warning: Invalid answer '%s' (not a letter), defaulting to A", answer)
         answer = "A"
     elif ord(answer) > ord(max_valid_letter):
-        print(f"  Warning: Answer '{answer}' exceeds choices (max={max_valid_letter}), defaulting to A")
+        logger.warning("  Warning: Answer '%s' exceeds choices (max=%s), defaulting to A", answer, max_valid_letter)
         answer = "A"
     
     # Debug info
-    print(f"  Domain: {domain} (conf: {confidence:.2f}) | Choices: {num_choices} (A-{max_valid_letter}) | Raw: '{raw_answer[:30]}...' -> {answer}")
+    logger.info("  Domain: %s (conf: %.2f) | Choices: %s (A-%s) | Raw: '%s...' -> %s", domain, confidence, num_choices, max_valid_letter, raw_answer[:30], answer)
     
-    return answer
+    # Only cache real LLM answers (an empty response gives the uncached default "A")
+    return remember_answer(cache_key, answer if raw_answer else None)
 
 def solve_stem_with_voting(item, strategy, domain, confidence):
     """
@@ -321,12 +330,12 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
     # Get context
     context = ""
     if strategy['use_rag'] and strategy['top_k_docs'] > 0:
-        retrieved_docs = rag.query(question_text)
-        retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+        context = "\n\n".join(doc.page_content for doc in retrieved_docs)
     
     # Construct prompt
-    prompt = construct_prompt(question_text, choices, context, "stem")
+    prompt = construct_prompt(question_text, choices, context, "stem",
+                              choices_str=item.get('_choices_str'))
     system_prompt = SYSTEM_PROMPTS.get("stem", SYSTEM_PROMPTS["multidomain"])
     
     messages = [
@@ -353,12 +362,11 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
             # Response is full API dict: {'choices': [{'message': {'content': '...'}}, ...]}
             for choice in response['choices']:
                 content = choice['message']['content']
-                answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-                match = re.search(answer_pattern, content, re.IGNORECASE)
+                match = VOTING_ANSWER_RE.search(content)
                 if match:
                     answer = match.group(1).upper()
                 else:
-                    match = re.search(r'\b([A-Z])\b', content)
+                    match = STANDALONE_LETTER_RE.search(content)
                     answer = match.group(1).upper() if match else "A"
                 
                 # Validate
@@ -369,12 +377,11 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
         elif isinstance(response, list):
             # Response is list of strings (shouldn't happen with current get_response)
             for content in response:
-                answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-                match = re.search(answer_pattern, content, re.IGNORECASE)
+                match = VOTING_ANSWER_RE.search(content)
                 if match:
                     answer = match.group(1).upper()
                 else:
-                    match = re.search(r'\b([A-Z])\b', content)
+                    match = STANDALONE_LETTER_RE.search(content)
                     answer = match.group(1).upper() if match else "A"
                 
                 # Validate
@@ -384,12 +391,11 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
                     answers.append("A")
         else:
             # Single string - treat as one answer (n=1 case)
-            answer_pattern = r'(?:^|\s|[Đđ]áp án|[Cc]họn|[Tt]rả lời)\s*[:\-]?\s*([A-Z])(?:[.\s]|$)'
-            match = re.search(answer_pattern, response, re.IGNORECASE)
+            match = VOTING_ANSWER_RE.search(response)
             if match:
                 answer = match.group(1).upper()
             else:
-                match = re.search(r'\b([A-Z])\b', response)
+                match = STANDALONE_LETTER_RE.search(response)
                 answer = match.group(1).upper() if match else "A"
             answers.append(answer if 'A' <= answer <= max_valid_letter else "A")
         
@@ -398,11 +404,11 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
         final_answer = vote_counts.most_common(1)[0][0]
         votes = vote_counts[final_answer]
         
-        print(f"  STEM Voting: {answers} → {final_answer} ({votes}/{len(answers)} votes) | Domain: {domain} (conf: {confidence:.2f})")
+        logger.info("  STEM Voting: %s → %s (%s/%s votes) | Domain: %s (conf: %.2f)", answers, final_answer, votes, len(answers), domain, confidence)
         return final_answer
         
     except Exception as e:
-        print(f"  STEM voting failed: {e}, falling back to single call")
+        logger.warning("  STEM voting failed: %s, falling back to single call", e)
         # Fallback to single question solving
         return solve_question(item)
 
@@ -410,6 +416,7 @@ def solve_stem_with_voting(item, strategy, domain, confidence):
 def solve_stem_with_self_verification(item, strategy, domain, confidence):
     """
     Solve STEM question with self-verification: generate answer then review full reasoning
+    Returns None when every attempt failed (the answer cache skips it)
     """
     from prompt_templates import SYSTEM_PROMPTS
     
@@ -422,19 +429,20 @@ def solve_stem_with_self_verification(item, strategy, domain, confidence):
     context = ""
     if strategy.get('use_rag', True) and strategy.get('top_k_docs', 1) > 0:
         try:
-            retrieved_docs = rag.query(question_text)
-            retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+            retrieved_docs = retrieve_docs(question_text, strategy['top_k_docs'])
+            context = "\n\n".join(doc.page_content for doc in retrieved_docs)
         except Exception as e:
-            print(f"  RAG failed: {e}, continuing without context")
+            logger.warning("  RAG failed: %s, continuing without context", e)
             context = ""
     
     # System prompt with 4-step CoT
     system_prompt = SYSTEM_PROMPTS.get("stem", SYSTEM_PROMPTS["multidomain"])
-    user_prompt = construct_prompt(question_text, choices, context, "stem")
+    user_prompt = construct_prompt(question_text, choices, context, "stem",
+                                   choices_str=item.get('_choices_str'))
     
     max_attempts = strategy.get('verification_attempts', 2)
     
+    answer = None  # Stays None when every attempt fails (API errors)
     for attempt in range(max_attempts + 1):
         try:
             # Step 1: Generate answer with reasoning
@@ -457,10 +465,10 @@ def solve_stem_with_self_verification(item, strategy, domain, confidence):
             )
             
             # Extract answer with new format
-            answer_match = re.search(r'===ĐÁP ÁN CUỐI CÙNG===\s*([A-Z])', response, re.IGNORECASE)
+            answer_match = FINAL_ANSWER_RE.search(response)
             if not answer_match:
                 # Fallback: last letter
-                matches = re.findall(r'\b([A-Z])\b', response)
+                matches = STANDALONE_LETTER_RE.findall(response)
                 answer = matches[-1].upper() if matches else "A"
             else:
                 answer = answer_match.group(1).upper()
@@ -501,19 +509,19 @@ LÝ DO: [ngắn gọn]"""
                 )
                 
                 # Check verification
-                if re.search(r'\bĐÚNG\b', verify_response, re.IGNORECASE):
-                    print(f"  STEM Self-Verify: {answer} VERIFIED ✓ (attempt {attempt+1}) | Domain: {domain} (conf: {confidence:.2f})")
+                if VERIFIED_RE.search(verify_response):
+                    logger.info("  STEM Self-Verify: %s VERIFIED ✓ (attempt %s) | Domain: %s (conf: %.2f)", answer, attempt + 1, domain, confidence)
                     return answer
                 else:
-                    print(f"  STEM Self-Verify: {answer} REJECTED ✗ (retrying...)")
+                    logger.info("  STEM Self-Verify: %s REJECTED ✗ (retrying...)", answer)
                     continue
             else:
                 # Last attempt, no verification
-                print(f"  STEM Self-Verify: {answer} (final attempt) | Domain: {domain} (conf: {confidence:.2f})")
+                logger.info("  STEM Self-Verify: %s (final attempt) | Domain: %s (conf: %.2f)", answer, domain, confidence)
                 return answer
         
         except Exception as e:
-            print(f"  STEM Self-Verify attempt {attempt+1} failed: {e}")
+            logger.warning("  STEM Self-Verify attempt %s failed: %s", attempt + 1, e)
             if attempt == max_attempts:
                 # Last attempt failed, return best effort
                 return answer
@@ -529,29 +537,36 @@ def process_domain_batch(domain_items, domain):
     Returns dict mapping qid to answer
     """
     # Get strategy for this domain
-    strategy = router.get_strategy_config(domain)
+    strategy = get_router().get_strategy_config(domain)
+    
+    # Batch-retrieve context for all items that need RAG (one embedding call)
+    needs_rag = strategy['use_rag'] and strategy['top_k_docs'] > 0
+    split_items = [(item, *split_context(item['question'])) for item in domain_items]
+    rag_questions = [
+        question_text for _, context, question_text in split_items
+        if needs_rag and not context
+    ]
+    docs_by_question = {}
+    if rag_questions:
+        docs_by_question = dict(zip(
+            rag_questions,
+            retrieve_docs_batch(rag_questions, strategy['top_k_docs'])
+        ))
     
     # Prepare items with context
     prepared_items = []
-    for item in domain_items:
-        question_text = item['question']
+    for item, context, question_text in split_items:
         choices = item['choices']
         
-        # Get context based on domain strategy
-        context = ""
-        if "Đoạn thông tin" in question_text:
-            parts = question_text.split("Câu hỏi:")
-            if len(parts) > 1:
-                context = parts[0].strip()
-                question_text = parts[-1].strip()
-        elif strategy['use_rag'] and strategy['top_k_docs'] > 0:
-            retrieved_docs = rag.query(question_text)
-            retrieved_docs = retrieved_docs[:strategy['top_k_docs']]
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        # Get context based on domain strategy (embedded passage or RAG)
+        if not context and needs_rag:
+            retrieved_docs = docs_by_question[question_text]
+            context = "\n\n".join(doc.page_content for doc in retrieved_docs)
             
         prepared_items.append({
             'question': question_text,
             'choices': choices,
+            '_choices_str': item.get('_choices_str'),
             'context': context,
             'qid': item['qid']
         })
@@ -561,7 +576,6 @@ def process_domain_batch(domain_items, domain):
     
     # Get domain-specific system prompt
     from prompt_templates import BATCH_SYSTEM_PROMPTS
-    from config import BATCH_CONFIG
     
     system_prompt = BATCH_SYSTEM_PROMPTS.get(
         domain.lower(),
@@ -574,8 +588,10 @@ def process_domain_batch(domain_items, domain):
     ]
 
     # Call LLM with domain-specific model and temperature
+    # Rate limits back off inside get_response_with_retry; parse errors re-ask immediately
+    max_attempts = BATCH_CONFIG.get('max_retries', 2) + 1
     answers = {}
-    for attempt in range(2):
+    for attempt in range(max_attempts):
         try:
             # Add response_format for JSON mode if enabled (not for STEM with reasoning)
             response_format = None
@@ -592,36 +608,55 @@ def process_domain_batch(domain_items, domain):
             # STEM: Extract from special format with ===DANH SÁCH ĐÁP ÁN===
             if domain.upper() == "STEM":
                 # Find the JSON after ===DANH SÁCH ĐÁP ÁN===
-                match = re.search(r'===DANH SÁCH ĐÁP ÁN===\s*\n?\s*(\{[^}]+\})', raw_answer, re.DOTALL)
+                match = BATCH_ANSWER_LIST_RE.search(raw_answer)
                 if match:
-                    json_str = match.group(1).strip()
-                    answers = json.loads(json_str)
+                    answers = index_batch_answers(parse_json_response(match.group(1)))
                 else:
-                    # Fallback: try to find individual answers
-                    for i in range(1, len(domain_items) + 1):
-                        pattern = rf'===ĐÁP ÁN CÂU {i}===\s*\n?\s*([A-Z])'
-                        ans_match = re.search(pattern, raw_answer)
-                        if ans_match:
-                            answers[str(i)] = ans_match.group(1)
-                        else:
-                            answers[str(i)] = "A"
+                    # Fallback: try to find individual answers (first marker per question)
+                    answers = {}
+                    for num, letter in BATCH_ITEM_ANSWER_RE.findall(raw_answer):
+                        answers.setdefault(int(num), letter)
             else:
                 # Other domains: Parse JSON directly
-                raw_answer = raw_answer.replace("```json", "").replace("```", "").strip()
-                answers = json.loads(raw_answer)
+                answers = index_batch_answers(parse_json_response(raw_answer))
             
             break
         except json.JSONDecodeError as e:
-            print(f"    JSON parse error (attempt {attempt + 1}): {e}")
-            if attempt == 1:
+            logger.warning("    JSON parse error (attempt %s): %s", attempt + 1, e)
+            if attempt == max_attempts - 1:
                 # Last attempt: Fallback to individual solving
-                print(f"    Batch failed, solving individually...")
+                logger.warning("    Batch failed, solving individually...")
                 for i, original_item in enumerate(domain_items, 1):
-                    ans = solve_question(original_item)
-                    answers[str(i)] = ans
+                    ans = solve_question(original_item, pre_classified_domain=domain)
+                    answers[i] = ans
                 break
     
-    return answers
+    # Map answers to QIDs
+    results = {}
+    for i, item in enumerate(prepared_items, 1):
+        ans = answers.get(i, "A")
+        if ans not in VALID_LETTERS:
+            ans = "A"
+        results[item['qid']] = ans
+    
+    return results
+
+
+def _timed_solve(item, pre_classified_domain=None):
+    """
+    Solve a single question inside a worker thread and measure its own latency
+    
+    Returns:
+        Tuple (qid, answer, elapsed_seconds, error) - error is None on success
+    """
+    start_time = time.time()
+    try:
+        answer = solve_question(item, pre_classified_domain=pre_classified_domain)
+        error = None
+    except Exception as e:
+        answer = 'A'
+        error = e
+    return item['qid'], answer, time.time() - start_time, error
 
 
 def predict_with_timing(test_data, output_submission, output_timing):
@@ -631,6 +666,13 @@ def predict_with_timing(test_data, output_submission, output_timing):
     2. Batch classify non-RAG questions with LLM (10 at a time)
     3. Accumulate into domain buffers
     4. Process when buffers reach batch_size
+    5. Single-mode questions are solved concurrently in a thread pool
+       (LLM calls are I/O-bound); rows are written as each one finishes
+    
+    Resumable: questions already in output_submission are skipped, except those whose
+    previous attempt failed (listed in <submission>_failed.txt), which are retried.
+    A qid leaves that list only once its retried row is on disk, so an interrupted
+    run keeps every pending retry.
     
     Args:
         test_data: List of test questions
@@ -639,16 +681,13 @@ def predict_with_timing(test_data, output_submission, output_timing):
     """
     total_items = len(test_data)
     
-    print(f"\nProcessing {total_items} questions...")
-    print("="*80)
-    print("\n📋 Domain Processing Config:")
-    for domain_name, config in DOMAIN_CONFIGS.items():
-        mode = "SINGLE" if not config.get('use_batch_processing', True) else f"BATCH ({config.get('batch_size', 10)})"
-        print(f"  {domain_name}: {mode}")
-    print("\nClassification Strategy:")
-    print("  - RAG: Keyword detection (no LLM)")
-    print("  - Non-RAG: LLM batch classification (10 questions/call)")
-    print("="*80)
+    modes = ", ".join(
+        f"{domain_name}: SINGLE" if not domain_config.get('use_batch_processing', True)
+        else f"{domain_name}: BATCH ({domain_config.get('batch_size', 10)})"
+        for domain_name, domain_config in DOMAIN_CONFIGS.items()
+    )
+    logger.info("\nProcessing %s questions | %s", total_items, modes)
+    logger.info("Classification: RAG by keyword detection (no LLM), non-RAG by LLM batch classification (10 questions/call)")
     
     # Check if output files exist to determine append or write mode
     submission_exists = os.path.exists(output_submission)
@@ -657,10 +696,35 @@ def predict_with_timing(test_data, output_submission, output_timing):
     submission_mode = 'a' if submission_exists else 'w'
     timing_mode = 'a' if timing_exists else 'w'
     
+    # Resume: collect questions already written to submission file
+    processed_qids = set()
     if submission_exists:
-        print(f"\n✓ Resuming: Appending to existing {os.path.basename(output_submission)}")
+        logger.info("\n✓ Resuming: Appending to existing %s", os.path.basename(output_submission))
+        try:
+            with open(output_submission, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Skip header
+                for row in reader:
+                    if row and len(row) >= 2:
+                        processed_qids.add(row[0])
+            logger.info("  ✓ Found %s already processed questions (will be skipped)", len(processed_qids))
+        except Exception as e:
+            logger.warning("  ⚠ Error reading existing file: %s, processing all questions", e)
+            processed_qids = set()
     else:
-        print(f"\n✓ Fresh start: Creating new {os.path.basename(output_submission)}")
+        logger.info("\n✓ Fresh start: Creating new %s", os.path.basename(output_submission))
+    
+    # Questions whose last attempt failed got a fallback 'A' row: retry them on resume
+    # (the retried row is appended; reorder_csv_by_input keeps the last row per qid)
+    failed_path = os.path.splitext(output_submission)[0] + '_failed.txt'
+    failed_qids = set()  # Still answered by a fallback row: carried over until retried
+    if os.path.exists(failed_path):
+        with open(failed_path, 'r', encoding='utf-8') as f:
+            failed_qids = {line.strip() for line in f if line.strip()}
+        retry_qids = processed_qids & failed_qids
+        if retry_qids:
+            logger.info("  ↻ Retrying %s questions that failed in the previous run", len(retry_qids))
+        processed_qids -= failed_qids
     
     # Open both output files
     submission_file = open(output_submission, submission_mode, newline='', encoding='utf-8')
@@ -687,7 +751,27 @@ def predict_with_timing(test_data, output_submission, output_timing):
     non_rag_buffer = []  # Buffer for non-RAG questions awaiting LLM classification
     classification_batch_size = 10  # Classify 10 non-RAG questions at a time
     
-    processed_count = 0
+    processed_count = len(processed_qids)
+    
+    def save_failed_qids():
+        """Replace <submission>_failed.txt with the current failed_qids (atomic swap)"""
+        tmp_path = failed_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(qid + '\n' for qid in sorted(failed_qids))
+        os.replace(tmp_path, failed_path)
+    
+    def record_failure(qid):
+        """Remember a qid answered with the fallback 'A' so the next run retries it"""
+        failed_qids.add(qid)
+        save_failed_qids()
+    
+    def resolve_failures(qids):
+        """Drop retried qids from the failed list (call after their rows are flushed)"""
+        resolved = failed_qids.intersection(qids)
+        if resolved:
+            failed_qids.difference_update(resolved)
+            save_failed_qids()
+    
     rag_detected = 0
     non_rag_classified = 0
     
@@ -695,15 +779,14 @@ def predict_with_timing(test_data, output_submission, output_timing):
         """Process a batch and write results with timing"""
         nonlocal processed_count
         
-        print(f"  Processing {domain} batch ({len(batch_items)} questions)...", end=' ')
         batch_start = time.time()
         
         try:
             # Use process_domain_batch if batch size > 1, otherwise single
             if len(batch_items) == 1:
-                # Single question
+                # Single question (keep the domain it was buffered under)
                 item = batch_items[0]
-                answer = solve_question(item)
+                answer = solve_question(item, pre_classified_domain=domain)
                 batch_results = {item['qid']: answer}
             else:
                 # Batch processing
@@ -726,19 +809,66 @@ def predict_with_timing(test_data, output_submission, output_timing):
             
             submission_file.flush()
             timing_file.flush()
+            resolve_failures(item['qid'] for item in batch_items)
             
-            print(f"✓ ({batch_time:.2f}s total, ~{per_question_time:.4f}s/question)")
+            logger.info("  %s batch (%s questions) ✓ (%.2fs total, ~%.4fs/question)", domain, len(batch_items), batch_time, per_question_time)
             
         except Exception as e:
-            print(f"✗ Error: {e}")
+            logger.warning("  %s batch (%s questions) ✗ Error: %s", domain, len(batch_items), e)
             # Fallback
             for item in batch_items:
                 submission_writer.writerow([item['qid'], 'A'])
                 timing_writer.writerow([item['qid'], 'A', 0.0])
+                record_failure(item['qid'])
                 processed_count += 1
             submission_file.flush()
             timing_file.flush()
     
+    # Thread pool for single-mode questions (LLM calls are I/O-bound)
+    executor = ThreadPoolExecutor(max_workers=PARALLEL_CONFIG.get('max_workers', 8))
+    pending_singles = set()
+    
+    def submit_single(item, pre_classified_domain=None):
+        """Queue a single question for concurrent solving"""
+        pending_singles.add(executor.submit(_timed_solve, item, pre_classified_domain))
+    
+    def write_single_results(wait_all=False):
+        """Write rows for finished single questions (block until all done if wait_all)"""
+        nonlocal processed_count
+        
+        if wait_all:
+            finished = as_completed(list(pending_singles))
+        else:
+            finished = [f for f in pending_singles if f.done()]
+        
+        written = 0
+        answered = []  # qids with a real answer, resolved once their rows are flushed
+        for future in finished:
+            pending_singles.discard(future)
+            qid, answer, item_time, error = future.result()
+            
+            submission_writer.writerow([qid, answer])
+            timing_writer.writerow([qid, answer, round(item_time, 4)])
+            processed_count += 1
+            written += 1
+            if wait_all:
+                # Rows trickle in while blocking: put each one on disk right away
+                submission_file.flush()
+                timing_file.flush()
+            
+            if error is not None:
+                record_failure(qid)
+                logger.warning("    %s ✗ Error: %s", qid, error)
+            else:
+                answered.append(qid)
+                logger.info("    %s ✓ %s (%.4fs) | Total: %s/%s", qid, answer, item_time, processed_count, total_items)
+        
+        # Non-blocking drain: one flush for all rows written in this pass
+        if written and not wait_all:
+            submission_file.flush()
+            timing_file.flush()
+        resolve_failures(answered)
+    
     try:
         # Process each question with optimized flow
         for idx, item in enumerate(test_data, 1):
@@ -746,13 +876,18 @@ def predict_with_timing(test_data, output_submission, output_timing):
             question_text = item['question']
             choices = item['choices']
             
+            # Skip questions already in output file (resume)
+            if qid in processed_qids:
+                continue
+            item['_choices_str'] = format_choices(choices)
+            
             # Step 1: Quick RAG detection with keywords
             if is_rag_question(question_text):
                 # RAG question detected
                 domain = "RAG"
                 rag_detected += 1
                 
-                strategy = router.get_strategy_config(domain)
+                strategy = get_router().get_strategy_config(domain)
                 use_batch = strategy.get('use_batch_processing', True)
                 batch_size = strategy.get('batch_size', 10)
                 
@@ -761,50 +896,31 @@ def predict_with_timing(test_data, output_submission, output_timing):
                     domain_buffers['RAG'].append(item)
                     
                     if len(domain_buffers['RAG']) >= batch_size:
-                        print(f"[{idx}/{total_items}] RAG buffer full ({len(domain_buffers['RAG'])}/{batch_size})")
+                        logger.info("[%s/%s] RAG buffer full (%s/%s)", idx, total_items, len(domain_buffers['RAG']), batch_size)
                         batch_to_process = domain_buffers['RAG'][:batch_size]
                         domain_buffers['RAG'] = domain_buffers['RAG'][batch_size:]
                         process_batch('RAG', batch_to_process)
                     else:
-                        print(f"[{idx}/{total_items}] {qid} → RAG buffer ({len(domain_buffers['RAG'])}/{batch_size})")
+                        logger.info("[%s/%s] %s → RAG buffer (%s/%s)", idx, total_items, qid, len(domain_buffers['RAG']), batch_size)
                 else:
-                    # Single mode: process immediately
-                    print(f"[{idx}/{total_items}] {qid} → RAG (SINGLE)...", end=' ')
-                    item_start = time.time()
-                    try:
-                        answer = solve_question(item)
-                        item_end = time.time()
-                        item_time = item_end - item_start
-                        
-                        submission_writer.writerow([qid, answer])
-                        timing_writer.writerow([qid, answer, round(item_time, 4)])
-                        processed_count += 1
-                        submission_file.flush()
-                        timing_file.flush()
-                        print(f"✓ ({item_time:.4f}s)")
-                    except Exception as e:
-                        print(f"✗ Error: {e}")
-                        item_end = time.time()
-                        submission_writer.writerow([qid, 'A'])
-                        timing_writer.writerow([qid, 'A', round(item_end - item_start, 4)])
-                        processed_count += 1
-                        submission_file.flush()
-                        timing_file.flush()
+                    # Single mode: solve concurrently, write when finished
+                    logger.info("[%s/%s] %s → RAG (SINGLE) → Queued", idx, total_items, qid)
+                    submit_single(item)
                 
+                write_single_results()
                 continue
             
             # Step 2: Non-RAG question - add to classification buffer
             non_rag_buffer.append(item)
-            print(f"[{idx}/{total_items}] {qid} → Non-RAG buffer ({len(non_rag_buffer)}/{classification_batch_size})")
+            logger.info("[%s/%s] %s → Non-RAG buffer (%s/%s)", idx, total_items, qid, len(non_rag_buffer), classification_batch_size)
             
             # Step 3: When non-RAG buffer is full, classify with LLM
             if len(non_rag_buffer) >= classification_batch_size:
                 batch_to_classify = non_rag_buffer[:classification_batch_size]
                 non_rag_buffer = non_rag_buffer[classification_batch_size:]
                 
-                print(f"  → Classifying {len(batch_to_classify)} non-RAG questions with LLM...", end=' ')
+                logger.info("  → Classifying %s non-RAG questions with LLM...", len(batch_to_classify))
                 classifications = classify_questions_with_llm(batch_to_classify)
-                print("✓")
                 
                 non_rag_classified += len(batch_to_classify)
                 
@@ -815,54 +931,36 @@ def predict_with_timing(test_data, output_submission, output_timing):
                     # Mark as LLM classified
                     classified_item['_llm_classified'] = True
                     
-                    strategy = router.get_strategy_config(classified_domain)
+                    strategy = get_router().get_strategy_config(classified_domain)
                     use_batch = strategy.get('use_batch_processing', True)
                     
                     if not use_batch:
-                        # Process single immediately
-                        print(f"    {classified_item['qid']} → {classified_domain} (LLM classify) → Processing single...", end=' ')
-                        try:
-                            start_time = time.time()
-                            answer = solve_question(classified_item, pre_classified_domain=classified_domain)
-                            end_time = time.time()
-                            inference_time = end_time - start_time
-                            
-                            submission_writer.writerow([classified_item['qid'], answer])
-                            timing_writer.writerow([classified_item['qid'], answer, round(inference_time, 4)])
-                            submission_file.flush()
-                            timing_file.flush()
-                            processed_count += 1
-                            
-                            print(f"✓ {answer} ({inference_time:.4f}s) | Total: {processed_count}/{total_items}")
-                        except Exception as e:
-                            print(f"✗ Error: {e}")
-                            submission_writer.writerow([classified_item['qid'], 'A'])
-                            timing_writer.writerow([classified_item['qid'], 'A', 0.0])
-                            submission_file.flush()
-                            timing_file.flush()
-                            processed_count += 1
+                        # Solve single concurrently, write when finished
+                        logger.info("    %s → %s (LLM classify) → Queued single", classified_item['qid'], classified_domain)
+                        submit_single(classified_item, pre_classified_domain=classified_domain)
                     else:
                         # Add to batch buffer
                         domain_buffers[classified_domain].append(classified_item)
-                        print(f"    {classified_item['qid']} → {classified_domain} buffer (LLM classify) ({len(domain_buffers[classified_domain])} total)")
+                        logger.info("    %s → %s buffer (LLM classify) (%s total)", classified_item['qid'], classified_domain, len(domain_buffers[classified_domain]))
                 
                 # Step 5: Process domain buffers that are full
                 for check_domain in domain_buffers.keys():
-                    strategy = router.get_strategy_config(check_domain)
+                    strategy = get_router().get_strategy_config(check_domain)
                     use_batch = strategy.get('use_batch_processing', True)
                     batch_size = strategy.get('batch_size', 10)
                     
                     if use_batch and len(domain_buffers[check_domain]) >= batch_size:
-                        print(f"  → {check_domain} buffer full ({len(domain_buffers[check_domain])}/{batch_size})")
+                        logger.info("  → %s buffer full (%s/%s)", check_domain, len(domain_buffers[check_domain]), batch_size)
                         batch_to_process = domain_buffers[check_domain][:batch_size]
                         domain_buffers[check_domain] = domain_buffers[check_domain][batch_size:]
                         process_batch(check_domain, batch_to_process)
+            
+            write_single_results()
         
         # Classify remaining non-RAG buffer
         if non_rag_buffer:
-            print(f"\nClassifying {len(non_rag_buffer)} remaining non-RAG questions...", end=' ')
+            logger.info("\nClassifying %s remaining non-RAG questions...", len(non_rag_buffer))
             classifications = classify_questions_with_llm(non_rag_buffer)
-            print("✓")
             
             non_rag_classified += len(non_rag_buffer)
             
@@ -872,94 +970,58 @@ def predict_with_timing(test_data, output_submission, output_timing):
                 # Mark as LLM classified
                 classified_item['_llm_classified'] = True
                 
-                strategy = router.get_strategy_config(classified_domain)
+                strategy = get_router().get_strategy_config(classified_domain)
                 use_batch = strategy.get('use_batch_processing', True)
                 
                 if not use_batch:
-                    # Process single immediately
-                    print(f"  {classified_item['qid']} → {classified_domain} (LLM classify) → Processing single...", end=' ')
-                    try:
-                        start_time = time.time()
-                        answer = solve_question(classified_item, pre_classified_domain=classified_domain)
-                        end_time = time.time()
-                        inference_time = end_time - start_time
-                        
-                        submission_writer.writerow([classified_item['qid'], answer])
-                        timing_writer.writerow([classified_item['qid'], answer, round(inference_time, 4)])
-                        submission_file.flush()
-                        timing_file.flush()
-                        processed_count += 1
-                        
-                        print(f"✓ {answer} ({inference_time:.4f}s) | Total: {processed_count}/{total_items}")
-                    except Exception as e:
-                        print(f"✗ Error: {e}")
-                        submission_writer.writerow([classified_item['qid'], 'A'])
-                        timing_writer.writerow([classified_item['qid'], 'A', 0.0])
-                        submission_file.flush()
-                        timing_file.flush()
-                        processed_count += 1
+                    # Solve single concurrently, write when finished
+                    logger.info("  %s → %s (LLM classify) → Queued single", classified_item['qid'], classified_domain)
+                    submit_single(classified_item, pre_classified_domain=classified_domain)
                 else:
                     # Add to batch buffer
                     domain_buffers[classified_domain].append(classified_item)
-                    print(f"  {classified_item['qid']} → {classified_domain} buffer (LLM classify)")
+                    logger.info("  %s → %s buffer (LLM classify)", classified_item['qid'], classified_domain)
         
         # Process remaining buffers
-        print("\n" + "="*80)
-        print("Processing remaining questions in buffers...")
-        print(f"Statistics: {rag_detected} RAG (keyword), {non_rag_classified} non-RAG (LLM classified)")
-        print("="*80)
+        logger.info("\nProcessing remaining questions in buffers | %s RAG (keyword), %s non-RAG (LLM classified)", rag_detected, non_rag_classified)
         
         for domain, remaining_items in domain_buffers.items():
             if remaining_items:
-                print(f"{domain}: {len(remaining_items)} remaining questions")
+                logger.info("%s: %s remaining questions", domain, len(remaining_items))
                 process_batch(domain, remaining_items)
         
-        print("="*80)
-        print(f"✓ Completed: {processed_count}/{total_items} questions processed")
+        # Wait for all in-flight single questions
+        if pending_singles:
+            logger.info("Waiting for %s in-flight single questions...", len(pending_singles))
+        write_single_results(wait_all=True)
+        
+        logger.info("✓ Completed: %s/%s questions processed", processed_count, total_items)
         
     finally:
+        executor.shutdown(wait=False, cancel_futures=True)
         submission_file.close()
         timing_file.close()
+        if not failed_qids and os.path.exists(failed_path):
+            os.remove(failed_path)
         
-        # Sort both output files by qid
-        print(f"\nSorting output files by question ID...")
-        
-        def get_sort_key(row):
-            qid = row[0]
-            try:
-                return int(qid.split('_')[1])
-            except:
-                return 0
+        # Put both output files back in input order
+        logger.info("\nSorting output files by input order...")
         
         # Sort submission.csv
         try:
-            with open(output_submission, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                data_rows = list(reader)
-            data_rows.sort(key=get_sort_key)
-            with open(output_submission, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                writer.writerows(data_rows)
-            print(f"✓ submission.csv sorted")
+            missing = reorder_csv_by_input(output_submission, test_data)
+            if missing:
+                logger.warning("⚠ Missing results for %s questions (rerun to resume)", missing)
+            logger.info("✓ submission.csv sorted")
         except Exception as e:
-            print(f"⚠ Could not sort submission.csv: {e}")
+            logger.warning("⚠ Could not sort submission.csv: %s", e)
         
         # Sort submission_time.csv
         try:
-            with open(output_timing, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                data_rows = list(reader)
-            data_rows.sort(key=get_sort_key)
-            with open(output_timing, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                writer.writerows(data_rows)
-            print(f"✓ submission_time.csv sorted")
+            reorder_csv_by_input(output_timing, test_data)
+            logger.info("✓ submission_time.csv sorted")
         except Exception as e:
-            print(f"⚠ Could not sort submission_time.csv: {e}")
+            logger.warning("⚠ Could not sort submission_time.csv: %s", e)
 
 
 def main():
@@ -972,45 +1034,35 @@ def main():
     output_submission = '/code/submission.csv'
     output_timing = '/code/submission_time.csv'
     
-    print("="*80)
-    print("VNPT AI - Prediction Pipeline")
-    print("="*80)
-    print(f"Input:  {input_path}")
-    print(f"Output: {output_submission}")
-    print(f"        {output_timing}")
-    print("="*80)
+    logger.info("VNPT AI - Prediction Pipeline | Input: %s | Output: %s, %s", input_path, output_submission, output_timing)
     
     # Check if input file exists
     if not os.path.exists(input_path):
-        print(f"✗ Error: Input file not found: {input_path}")
-        print("Note: Make sure to mount the test data to /code/private_test.json")
+        logger.error("✗ Error: Input file not found: %s (mount the test data to /code/private_test.json)", input_path)
         return
     
     # Load test data
     try:
         with open(input_path, 'r', encoding='utf-8') as f:
             test_data = json.load(f)
-        print(f"✓ Loaded {len(test_data)} questions from {input_path}")
+        logger.info("✓ Loaded %s questions from %s", len(test_data), input_path)
     except Exception as e:
-        print(f"✗ Error loading input file: {e}")
+        logger.error("✗ Error loading input file: %s", e)
         return
     
+    # Heavy init (RAG + router + semantic cache) once, before worker threads start using them
+    get_router()
+    get_rag()
+    get_semantic_cache()
+    
     # Process all questions with timing (writes as it goes)
     start_total = time.time()
     predict_with_timing(test_data, output_submission, output_timing)
     end_total = time.time()
     
     # Summary
-    print("\n" + "="*80)
-    print("✓ PREDICTION COMPLETE")
-    print("="*80)
-    print(f"Total questions processed: {len(test_data)}")
-    print(f"Output files:")
-    print(f"  - {output_submission}")
-    print(f"  - {output_timing}")
-    print(f"\nTotal inference time: {end_total - start_total:.2f}s")
-    print(f"Average per question: {(end_total - start_total) / len(test_data):.4f}s")
-    print("="*80)
+    total_time = end_total - start_total
+    logger.info("\n✓ PREDICTION COMPLETE | %s questions | Total inference time: %.2fs | Average per question: %.4fs", len(test_data), total_time, total_time / max(len(test_data), 1))
 
 
 if __name__ == "__main__":
@@ -335,11 +335,12 @@ def format_choices(choices):
         formatted.append(f"{label}. {choice}")
     return "\n".join(formatted)
 
-def construct_prompt(question, choices, context="", domain="multidomain"):
+def construct_prompt(question, choices, context="", domain="multidomain", choices_str=None):
     """
     Construct the full prompt for the LLM based on domain
+    choices_str: pre-formatted choices (item['_choices_str']), formatted here if None
     """
-    choices_str = format_choices(choices)
+    choices_str = choices_str or format_choices(choices)
     template = USER_PROMPT_TEMPLATES.get(domain, USER_PROMPT_TEMPLATES["multidomain"])
     
     # For precision_critical, context is not needed
@@ -355,30 +356,30 @@ def construct_prompt(question, choices, context="", domain="multidomain"):
         choices=choices_str
     )
 
-def construct_batch_prompt(items, domain="multidomain"):
-    """
-    Construct the prompt for a batch of questions (same domain).
-    items: list of dicts, each containing 'question', 'choices', optional 'context'
-    domain: domain name to select appropriate template
-    """
-    questions_content = []
+BATCH_QUESTION_SEPARATOR = "\n----------------\n"
+
+def _iter_batch_questions(items):
+    """Yield the formatted block for each question of a batch (numbered from 1)"""
     for i, item in enumerate(items, 1):
-        q_text = item['question']
-        choices_str = format_choices(item['choices'])
+        choices_str = item.get('_choices_str') or format_choices(item['choices'])
         context = item.get('context', "Không có thông tin tham khảo cụ thể.")
-        
-        content = f"""Câu {i}:
+        yield f"""Câu {i}:
 [Thông tin tham khảo]
 {context}
 
 [Câu hỏi]
-{q_text}
+{item['question']}
 
 [Các lựa chọn]
 {choices_str}
 """
-        questions_content.append(content)
-    
+
+def construct_batch_prompt(items, domain="multidomain"):
+    """
+    Construct the prompt for a batch of questions (same domain).
+    items: list of dicts, each containing 'question', 'choices', optional 'context', '_choices_str'
+    domain: domain name to select appropriate template
+    """
     # Select template based on domain
     if domain.upper() == "STEM":
         template = BATCH_USER_PROMPT_TEMPLATE_STEM
@@ -387,5 +388,5 @@ def construct_batch_prompt(items, domain="multidomain"):
         
     return template.format(
         num_questions=len(items),
-        questions_content="\n----------------\n".join(questions_content)
+        questions_content=BATCH_QUESTION_SEPARATOR.join(_iter_batch_questions(items))
     )
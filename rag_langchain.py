@@ -17,7 +17,7 @@ class VNPTEmbeddings(Embeddings):
         self._load_credentials()
 
     def _load_credentials(self):
-        with open(self.api_key_file, 'r') as f:
+        with open(self.api_key_file, 'r', encoding='utf-8') as f:
             api_keys = json.load(f)
         
         key_info = next((item for item in api_keys if item["llmApiName"] == "LLM embedings"), None)
@@ -89,6 +89,8 @@ class LangChainRAG:
             collection_name="vnpt_knowledge_base"
         )
         self.retriever = None
+        self.bm25_retriever = None
+        self.vector_k = 3
 
     def ingest_data(self, file_paths: List[str]):
         """Ingest text files into the vector store"""
@@ -150,7 +152,7 @@ class LangChainRAG:
     def setup_retriever(self):
         """Setup Hybrid Retriever (Vector + BM25)"""
         # 1. Vector Retriever
-        vector_retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
+        vector_retriever = self.vectorstore.as_retriever(search_kwargs={"k": self.vector_k})
         
         # 2. BM25 Retriever
         # Fetch existing docs from Chroma to build BM25 index
@@ -164,6 +166,7 @@ class LangChainRAG:
         print(f"Initializing BM25 with {len(all_texts)} documents...")
         bm25_retriever = BM25Retriever.from_texts(all_texts)
         bm25_retriever.k = 3
+        self.bm25_retriever = bm25_retriever
 
         # 3. Ensemble
         self.retriever = EnsembleRetriever(
@@ -181,6 +184,56 @@ class LangChainRAG:
             return []
 
         return self.retriever.invoke(question)
+
+    def embed_query(self, question: str) -> List[float]:
+        """Embed a single question with the retriever's embedding model ([] on failure)"""
+        return self.embedding_model.embed_query(question)
+
+    def embed_queries(self, questions: List[str]) -> List[List[float]]:
+        """Embed many questions in one embed_documents call (parallel API requests)"""
+        return self.embedding_model.embed_documents(questions)
+
+    def query_by_embedding(self, question: str, embedding: List[float]):
+        """
+        Same hybrid retrieval as query(), but reuses a precomputed question embedding
+        for the vector side instead of embedding the question again.
+        """
+        if not self.retriever:
+            print("Initializing retriever...")
+            self.setup_retriever()
+
+        if not self.retriever:
+            return []
+
+        bm25_docs = self.bm25_retriever.invoke(question)
+        # Failed embedding comes back as [] -> BM25 only
+        vector_docs = []
+        if embedding:
+            vector_docs = self.vectorstore.similarity_search_by_vector(embedding, k=self.vector_k)
+        return self.retriever.weighted_reciprocal_rank([bm25_docs, vector_docs])
+
+    def query_batch(self, questions: List[str], top_k: int = None):
+        """
+        Retrieve documents for many questions at once.
+        All questions are embedded in a single embed_documents call (parallel API
+        requests), then BM25 + vector results are fused per question with the
+        same weighted reciprocal rank as query().
+        Returns a list of document lists, aligned with questions.
+        """
+        if not self.retriever:
+            print("Initializing retriever...")
+            self.setup_retriever()
+
+        if not self.retriever or not questions:
+            return [[] for _ in questions]
+
+        query_embeddings = self.embed_queries(questions)
+
+        results = []
+        for question, embedding in zip(questions, query_embeddings):
+            docs = self.query_by_embedding(question, embedding)
+            results.append(docs[:top_k] if top_k else docs)
+        return results
     
     
 # import json
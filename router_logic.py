@@ -1,5 +1,5 @@
 import re
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 # Import config for domain configurations
 try:
@@ -43,6 +43,14 @@ class QuestionRouter:
             'arcsin', 'arccos', 'arctan', 'arcsec', 'arccsc', 'arccot'
         ]
         
+        # STEM indicators compiled once: each one matches as a regex on the raw
+        # text or as a literal on the lowercased text (same as checking them one by one)
+        self._latex_re = re.compile(r'\$.*\$')
+        self._stem_regex = re.compile('|'.join(self.stem_indicators))
+        self._stem_literal_re = re.compile(
+            '|'.join(re.escape(indicator.lower()) for indicator in self.stem_indicators)
+        )
+        
     def classify_question(self, question_text: str, choices: list) -> Tuple[str, float]:
         """
         Classify a question into one of the 5 domains
@@ -67,6 +75,17 @@ class QuestionRouter:
         # 5. Default to Multidomain
         return "MULTIDOMAIN", 0.6
     
+    def classify_batch(self, questions: list, choices: list) -> List[Tuple[str, float]]:
+        """
+        Classify many questions in one pass (same rules as classify_question)
+        choices: list of choice lists, aligned with questions
+        Returns: list of (domain_name, confidence_score) in input order
+        """
+        return [
+            self.classify_question(question_text, item_choices)
+            for question_text, item_choices in zip(questions, choices)
+        ]
+    
     def _is_precision_critical(self, question_text: str, choices: list) -> bool:
         """
         Detect questions that should NOT be answered (harmful/sensitive)
@@ -97,14 +116,13 @@ class QuestionRouter:
         Detect math and logical reasoning questions
         """
         # Check for LaTeX math symbols
-        if re.search(r'\$.*\$', question_text):
+        if self._latex_re.search(question_text):
             return True
         
         # Check for math/science keywords and symbols
-        question_lower = question_text.lower()
-        stem_count = sum(
-            1 for indicator in self.stem_indicators
-            if indicator.lower() in question_lower or re.search(indicator, question_text)
+        has_stem_indicator = bool(
+            self._stem_regex.search(question_text)
+            or self._stem_literal_re.search(question_text.lower())
         )
         
         # Check for trigonometry terms in choices (strong indicator)
@@ -122,8 +140,8 @@ class QuestionRouter:
             if trig_count >= 3:  # 3+ trig terms in choices = definitely STEM
                 return True
         
-        # Lower threshold to 1 (single strong indicator is enough)
-        return stem_count >= 1
+        # Single strong indicator is enough
+        return has_stem_indicator
     
     def _is_compulsory(self, question_text: str) -> bool:
         """
@@ -207,11 +225,11 @@ class QuestionRouter:
             "MULTIDOMAIN": []
         }
         
-        for item in items:
-            domain, confidence = self.classify_question(
-                item['question'], 
-                item['choices']
-            )
+        results = self.classify_batch(
+            [item['question'] for item in items],
+            [item['choices'] for item in items]
+        )
+        for item, (domain, confidence) in zip(items, results):
             item['domain'] = domain
             item['confidence'] = confidence
             domain_groups[domain].append(item)
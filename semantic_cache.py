@@ -0,0 +1,133 @@
+"""
+semantic_cache.py - LSH-based semantic cache for near-duplicate questions
+
+Random-projection LSH over question embeddings: sign(emb @ R) gives an nbits
+bucket key per hash table. Only entries sharing a bucket in at least one table
+are compared with exact cosine similarity, so lookup cost stays ~O(bucket size)
+instead of O(cache size). At most max_entries are kept (oldest evicted first).
+"""
+
+import threading
+import numpy as np
+
+
+class SemanticCache:
+    """Map question embeddings to values, returning hits for cosine >= threshold"""
+
+    def __init__(self, nbits=8, num_tables=4, threshold=0.95, seed=42, max_entries=4096):
+        """
+        Args:
+            nbits: Hyperplanes per hash table (more bits = smaller, stricter buckets)
+            num_tables: Independent hash tables (more tables = higher recall)
+            threshold: Minimum cosine similarity to count as a hit
+            seed: Seed for the random projection matrices
+            max_entries: Maximum cached entries; the oldest is evicted when full
+        """
+        self.nbits = nbits
+        self.num_tables = num_tables
+        self.threshold = threshold
+        self.seed = seed
+        self.max_entries = max_entries
+
+        self._projections = None  # [num_tables, dim, nbits], built on first insert
+        self._tables = [{} for _ in range(num_tables)]  # bucket key -> entry ids
+        self._entries = {}  # entry id -> (unit_embedding, value, bucket_keys), insertion ordered
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.generation = 0  # Bumped by invalidate() (e.g. after index rebuild)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        """Unit-normalize an embedding (None if empty / zero vector)"""
+        if embedding is None or len(embedding) == 0:
+            return None
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else None
+
+    def _bucket_keys(self, unit):
+        """One bucket key per hash table"""
+        if self._projections is None:
+            rng = np.random.default_rng(self.seed)
+            self._projections = rng.standard_normal(
+                (self.num_tables, unit.shape[0], self.nbits)
+            ).astype(np.float32)
+        bits = np.einsum('d,tdb->tb', unit, self._projections) > 0
+        return [np.packbits(table_bits).tobytes() for table_bits in bits]
+
+    def get(self, embedding):
+        """Return the value of the most similar cached entry, or None on miss"""
+        unit = self._normalize(embedding)
+        if unit is None:
+            return None
+
+        with self._lock:
+            if self._projections is None or unit.shape[0] != self._projections.shape[1]:
+                self.misses += 1
+                return None
+
+            candidates = set()
+            for table, key in zip(self._tables, self._bucket_keys(unit)):
+                candidates.update(table.get(key, ()))
+
+            best_value, best_sim = None, self.threshold
+            for entry_id in candidates:
+                cached_unit, value, _ = self._entries[entry_id]
+                sim = float(cached_unit @ unit)
+                if sim >= best_sim:
+                    best_value, best_sim = value, sim
+
+            if best_value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best_value
+
+    def put(self, embedding, value, generation=None):
+        """
+        Insert an entry (ignored for empty embeddings)
+        generation: self.generation read before the lookup that produced value;
+                    the put is dropped if invalidate() ran since (value may be stale)
+        """
+        unit = self._normalize(embedding)
+        if unit is None:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self._projections is not None and unit.shape[0] != self._projections.shape[1]:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._evict_oldest()
+
+            keys = self._bucket_keys(unit)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (unit, value, keys)
+            for table, key in zip(self._tables, keys):
+                table.setdefault(key, []).append(entry_id)
+
+    def _evict_oldest(self):
+        """Remove the oldest entry from the entry map and its buckets (lock held)"""
+        entry_id = next(iter(self._entries))
+        _, _, keys = self._entries.pop(entry_id)
+        for table, key in zip(self._tables, keys):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del table[key]
+
+    def invalidate(self):
+        """Drop all entries and start a new generation"""
+        with self._lock:
+            self._tables = [{} for _ in range(self.num_tables)]
+            self._entries = {}
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._entries)